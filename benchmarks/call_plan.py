@@ -0,0 +1,112 @@
+"""Per-request overhead of the route handler, with and without precompiled call plans.
+
+Usage: python benchmarks/call_plan.py [iterations]
+"""
+
+import asyncio
+import inspect
+import sys
+import time
+from dataclasses import dataclass
+
+import liku as e
+from starlette.requests import Request
+from starlette.responses import HTMLResponse
+
+sys.path.insert(0, ".")
+
+from likulau.hooks import RequestContext  # noqa: E402
+from likulau._internal.providers import provide_all  # noqa: E402
+from likulau._internal.routes import LikulauRoute, create_route  # noqa: E402
+from likulau._internal.utils import run_async  # noqa: E402
+from likulau.routes import inline  # noqa: E402
+
+
+@dataclass
+class Props:
+    name: str
+
+
+def get_ssr_props(request: Request) -> Props:
+    return Props("bench")
+
+
+async def get_ssr_props_async(request: Request) -> Props:
+    return Props("bench")
+
+
+def layout(props: Props, children: e.HTMLElement) -> e.HTMLElement:
+    return e.body(children=children)
+
+
+async def layout_async(props: Props, children: e.HTMLElement) -> e.HTMLElement:
+    return e.body(children=children)
+
+
+def page(props: Props) -> e.HTMLElement:
+    return e.p(children=props.name)
+
+
+async def page_async(props: Props) -> e.HTMLElement:
+    return e.p(children=props.name)
+
+
+get_ssr_props_inline = inline()(lambda request: Props("bench"))
+layout_inline = inline()(lambda props, children: e.body(children=children))
+page_inline = inline()(lambda props: e.p(children=props.name))
+
+
+def create_route_without_plan(route: LikulauRoute):
+    """The request handler as it was before call plans, kept for comparison."""
+
+    async def inner(request: Request):
+        props = None
+        if route.ssr_props_func:
+            props = await run_async(route.ssr_props_func, request)
+
+        with RequestContext.provide(request):
+            async with provide_all():
+                if len(inspect.signature(route.page_func).parameters) == 1:
+                    response = await run_async(route.page_func, props)  # type: ignore
+                else:
+                    response = await run_async(route.page_func)  # type: ignore
+
+                if isinstance(response, e.HTMLElement):
+                    if route.layout_func:
+                        response = await run_async(route.layout_func, props, response)
+                    response = HTMLResponse(str(response))
+
+        return response
+
+    return inner
+
+
+async def measure(handler, iterations: int):
+    request = Request(
+        {"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": []}
+    )
+    for _ in range(min(iterations, 100)):
+        await handler(request)
+
+    start = time.perf_counter()
+    for _ in range(iterations):
+        await handler(request)
+    return (time.perf_counter() - start) / iterations
+
+
+async def main(iterations: int):
+    scenarios = {
+        "sync": LikulauRoute("/", page, None, get_ssr_props, layout),
+        "async": LikulauRoute("/", page_async, None, get_ssr_props_async, layout_async),
+        "inline": LikulauRoute("/", page_inline, None, get_ssr_props_inline, layout_inline),
+    }
+
+    print(f"{'scenario':<10}{'before (us)':>14}{'after (us)':>14}{'speedup':>10}")
+    for name, route in scenarios.items():
+        before = await measure(create_route_without_plan(route), iterations)
+        after = await measure(create_route(route), iterations)
+        print(f"{name:<10}{before * 1e6:>14.1f}{after * 1e6:>14.1f}{before / after:>9.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
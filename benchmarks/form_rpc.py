@@ -0,0 +1,110 @@
+"""Throughput of a plain page behind the form RPC middleware.
+
+Compares no middleware, the previous BaseHTTPMiddleware based implementation and
+the current pure ASGI one, calling the application directly without a server.
+
+Usage: python benchmarks/form_rpc.py [requests]
+"""
+
+import asyncio
+import sys
+import time
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import HTMLResponse
+from starlette.routing import Route
+
+sys.path.insert(0, ".")
+
+from likulau._internal.form_rpc import RPC_IDENT, RPC_MAPPING, FormRPCMiddleware  # noqa: E402
+
+
+class BaseHTTPFormRPCMiddleware(BaseHTTPMiddleware):
+    """The middleware as it was before being rewritten as pure ASGI, kept for comparison."""
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+        rpc_ident = request.query_params.get(RPC_IDENT)
+        if not rpc_ident:
+            return await call_next(request)
+
+        rpc_func = RPC_MAPPING.get(rpc_ident)
+        if not rpc_func:
+            return await call_next(request)
+
+        async with request.form() as form:
+            return HTMLResponse(str(rpc_func(form)))
+
+
+async def page(request: Request):
+    return HTMLResponse("<p>Hello world!</p>")
+
+
+def create_app(middleware: type | None):
+    return Starlette(
+        routes=[Route("/", page)],
+        middleware=[Middleware(middleware)] if middleware else [],
+    )
+
+
+async def measure(app, requests: int):
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/",
+        "raw_path": b"/",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "server": ("bench", 80),
+        "client": ("bench", 1234),
+    }
+
+    def create_receive():
+        received = False
+
+        async def receive():
+            nonlocal received
+            if not received:
+                received = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+
+            # Like a server, nothing else arrives until the client disconnects
+            await asyncio.Future()
+
+        return receive
+
+    async def send(message):
+        pass
+
+    for _ in range(min(requests, 100)):
+        await app(dict(scope), create_receive(), send)
+
+    start = time.perf_counter()
+    for _ in range(requests):
+        await app(dict(scope), create_receive(), send)
+    return requests / (time.perf_counter() - start)
+
+
+async def main(requests: int):
+    scenarios = {
+        "none": None,
+        "basehttp": BaseHTTPFormRPCMiddleware,
+        "asgi": FormRPCMiddleware,
+    }
+
+    baseline = None
+    print(f"{'middleware':<12}{'req/s':>12}{'vs none':>10}")
+    for name, middleware in scenarios.items():
+        throughput = await measure(create_app(middleware), requests)
+        baseline = baseline or throughput
+        print(f"{name:<12}{throughput:>12.0f}{throughput / baseline:>9.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000))
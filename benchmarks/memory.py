@@ -0,0 +1,125 @@
+"""Memory traced per request, checked against a budget.
+
+Serves requests one at a time through the ASGI app and records, with tracemalloc, the
+peak memory each of them allocated on top of what was already in use, along with the
+memory still held once all of them finished. Exits with status 1 when the median peak
+of any request exceeds the budget, or when memory keeps growing, so it can run in CI.
+tests/test_memory.py checks the same budget against a smaller app under pytest.
+
+By default this generates an app like benchmarks/suite.py does, once without providers
+and once with a chain of them. Pass --app to measure your own app instead, such as the
+example app, along with the paths to request.
+
+Usage:
+    python benchmarks/memory.py [--budget 24576] [--requests 200]
+    python benchmarks/memory.py --app example --path / --path /form
+"""
+
+import argparse
+from array import array
+import asyncio
+import os
+import statistics
+import sys
+import tempfile
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from suite import call, create_requests, create_scope, generate_app  # noqa: E402
+
+ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_BUDGET = 24_576
+# Allowed growth over the second half of the requests
+RETAINED_ALLOWANCE = 1024
+
+
+async def measure(app, scope: dict, body: bytes, requests: int):
+    # Warm up first, so imports, compiled plans and caches are not counted
+    for _ in range(20):
+        await call(app, scope, body)
+
+    # Allocated up front, a growing list of results would count as retained memory
+    peaks = array("q", bytes(8 * requests))
+    tracemalloc.start()
+    try:
+        halfway = 0
+        for index in range(requests):
+            if index == requests // 2:
+                # Compared from halfway, what the first traced requests cache is not a leak
+                halfway, _ = tracemalloc.get_traced_memory()
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await call(app, scope, body)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[index] = peak - current
+
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return statistics.median(peaks), retained - halfway
+
+
+async def run_app(requests: dict[str, tuple[dict, bytes]], count: int):
+    from likulau.app import create_app
+
+    app = create_app(isr=False, lazy=False)
+    results = {}
+    async with app.router.lifespan_context(app):
+        for name, (scope, body) in requests.items():
+            results[name] = await measure(app, scope, body, count)
+    return results
+
+
+def measure_directory(directory: Path, requests, count: int):
+    cwd = os.getcwd()
+    os.chdir(directory)
+    sys.path.insert(0, str(directory))
+    try:
+        return asyncio.run(run_app(requests(), count))
+    finally:
+        sys.path.remove(str(directory))
+        for module in [module for module in sys.modules if module == "src" or module.startswith("src.")]:
+            del sys.modules[module]
+        os.chdir(cwd)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--budget", type=int, default=DEFAULT_BUDGET, help="Bytes allowed per request")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--app", type=Path, help="Directory of the app to measure")
+    parser.add_argument("--path", action="append", help="Path to request, with --app")
+    args = parser.parse_args()
+    sys.path.insert(0, str(ROOT))
+
+    results = {}
+    if args.app:
+        paths = args.path or ["/"]
+        requests = lambda: {path: (create_scope("GET", path), b"") for path in paths}  # noqa: E731
+        results = measure_directory(args.app.resolve(), requests, args.requests)
+    else:
+        for providers in (0, 4):
+            with tempfile.TemporaryDirectory() as directory:
+                dynamic_path = generate_app(Path(directory), pages=5, depth=3, providers=providers)
+                app_results = measure_directory(
+                    Path(directory), lambda: create_requests(dynamic_path), args.requests
+                )
+            for name, result in app_results.items():
+                results[f"{name} ({providers} providers)"] = result
+
+    failed = False
+    print(f"{'request':<28}{'peak bytes':>12}{'retained':>10}")
+    for name, (peak, retained) in results.items():
+        over = peak > args.budget or retained > RETAINED_ALLOWANCE
+        failed = failed or over
+        print(f"{name:<28}{peak:>12.0f}{retained:>10}{'  over budget' if over else ''}")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""Route matching time of Starlette's router against the segment tree router.
+
+Builds a route table like the one of a large generated site, sorted the way likulau
+sorts discovered pages. tests/test_router.py checks both routers pick the same routes.
+
+Usage: python benchmarks/router.py [routes] [iterations]
+"""
+
+import asyncio
+import sys
+import time
+from types import SimpleNamespace
+
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route, Router
+
+sys.path.insert(0, ".")
+
+from likulau._internal.router import SegmentRouter  # noqa: E402
+from likulau._internal.routes import _sort_route  # noqa: E402
+
+
+def create_routes(count: int):
+    paths = ["/"]
+    for index in range(count):
+        section = f"/section{index % 50}"
+        kind = index % 4
+        if kind == 0:
+            paths.append(f"{section}/page{index}")
+        elif kind == 1:
+            paths.append(f"{section}/{{slug}}/page{index}")
+        elif kind == 2:
+            paths.append(f"{section}/page{index}/{{post_id:int}}")
+        else:
+            paths.append(f"{section}/archive{index}/{{year}}/{{month}}")
+
+    # Sorted like discover_pages() sorts them, static routes first
+    paths.sort(key=lambda path: _sort_route(SimpleNamespace(path=path)))  # type: ignore
+
+    def endpoint_for(path: str):
+        async def endpoint(request):
+            return PlainTextResponse(path)
+
+        return endpoint
+
+    return [Route(path, endpoint_for(path)) for path in paths]
+
+
+async def call(router: Router, path: str):
+    scope = {
+        "type": "http",
+        "method": "GET",
+        "path": path,
+        "root_path": "",
+        "query_string": b"",
+        "headers": [],
+    }
+    result = {}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            result["status"] = message["status"]
+        elif message["type"] == "http.response.body":
+            result["body"] = result.get("body", b"") + message.get("body", b"")
+
+    await router(scope, receive, send)
+    return result["status"], result.get("body")
+
+
+async def main(count: int, iterations: int):
+    routes = create_routes(count)
+    routers = {"starlette": Router(routes), "segment": SegmentRouter(routes)}
+    paths = {
+        "first": "/",
+        "static": f"/section{(count - 4) % 50}/page{count - 4}",
+        "param": f"/section{(count - 3) % 50}/hello/page{count - 3}",
+        "not found": "/missing/path",
+        "redirect": f"/section{(count - 4) % 50}/page{count - 4}/",
+    }
+
+    print(f"{'path':<12}{'starlette (us)':>16}{'segment (us)':>14}{'speedup':>9}")
+    for name, path in paths.items():
+        timings = {}
+        for router_name, router in routers.items():
+            start = time.perf_counter()
+            for _ in range(iterations):
+                await call(router, path)
+            timings[router_name] = (time.perf_counter() - start) / iterations * 1e6
+
+        speedup = timings["starlette"] / timings["segment"]
+        print(f"{name:<12}{timings['starlette']:>16.1f}{timings['segment']:>14.1f}{speedup:>8.2f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(
+        main(
+            int(sys.argv[1]) if len(sys.argv) > 1 else 2000,
+            int(sys.argv[2]) if len(sys.argv) > 2 else 500,
+        )
+    )
@@ -0,0 +1,472 @@
+"""Benchmarks likulau against generated apps, writing the results as JSON.
+
+Two apps are generated, one without providers and one with a chain of them, each with
+flat pages, a deep dynamic route, a page with a layout and a form RPC handler. For
+each app this measures:
+
+- startup: create_app() in a fresh process, with and without a route manifest
+- requests: in-process ASGI throughput and latency percentiles per kind of page
+- memory: traced memory per in-flight request, and memory retained after the run
+- build: build_app() throughput, from scratch and when nothing changed
+
+Every measurement runs in its own process, inside the generated app directory.
+
+Usage:
+    python benchmarks/suite.py [--pages 50] [--depth 6] [--providers 8] [--requests 2000]
+                               [--concurrency 16] [--output results.json] [--compare old.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+SCENARIOS = ("static", "dynamic", "layout", "rpc")
+
+FLAT_PAGE = """\
+import liku as e
+
+
+def page() -> e.HTMLElement:
+    return e.div(
+        children=[
+            e.h1(children="Page {index}"),
+            e.ul(children=[e.li(children=f"Item {{n}}") for n in range(20)]),
+        ]
+    )
+"""
+
+DYNAMIC_PAGE = """\
+from dataclasses import dataclass
+
+import liku as e
+from starlette.requests import Request
+
+
+@dataclass
+class Props:
+    params: dict
+
+
+def get_static_paths():
+    return [{{{params}}}]
+
+
+def get_ssr_props(request: Request) -> Props:
+    return Props(dict(request.path_params))
+
+
+def page(props: Props) -> e.HTMLElement:
+    return e.ul(children=[e.li(children=f"{{k}}={{v}}") for k, v in props.params.items()])
+"""
+
+LAYOUT_PAGE = """\
+from dataclasses import dataclass
+
+import liku as e
+from starlette.requests import Request
+
+
+@dataclass
+class Props:
+    title: str
+
+
+def get_ssr_props(request: Request) -> Props:
+    return Props("Layout")
+
+
+def layout(props: Props, children: e.HTMLElement) -> e.HTMLElement:
+    return e.html(
+        children=[
+            e.head(children=[e.title(children=props.title)]),
+            e.body(children=[e.nav(children=[e.a(props={"href": "/"}, children="Home")]), children]),
+        ]
+    )
+
+
+def page(props: Props) -> e.HTMLElement:
+    return e.main(children=[e.h1(children=props.title)])
+"""
+
+FORM_PAGE = """\
+import liku as e
+from starlette.datastructures import FormData
+
+from likulau.form import Form
+
+
+def submit(form: FormData):
+    return e.p(children=f"Hello, {form.get('name')}!")
+
+
+def page() -> e.HTMLElement:
+    return Form(
+        action=submit,
+        method="POST",
+        children=[e.input(props={"type": "text", "name": "name"}), e.input(props={"type": "submit"})],
+    )
+"""
+
+PROVIDER = """\
+from contextlib import contextmanager
+
+from liku.context import Context
+
+from likulau.providers import provider
+{imports}
+
+Context{index} = Context[int]("context{index}")
+
+
+@provider(Context{index}, [{dependencies}])
+@contextmanager
+def provider{index}():
+    with Context{index}.provide({index}):
+        yield
+"""
+
+
+def generate_app(directory: Path, pages: int, depth: int, providers: int):
+    (directory / "src/pages").mkdir(parents=True)
+    (directory / "src/providers").mkdir()
+    (directory / "src/__init__.py").touch()
+
+    for index in range(pages):
+        (directory / f"src/pages/page{index}.py").write_text(FLAT_PAGE.format(index=index))
+
+    names = [f"p{level}" for level in range(depth)]
+    dynamic_file = directory / "src/pages/deep" / Path(*(f"[{name}]" for name in names))
+    dynamic_file = dynamic_file.with_suffix(".py")
+    dynamic_file.parent.mkdir(parents=True, exist_ok=True)
+    params = ", ".join(f'"{name}": "v{level}"' for level, name in enumerate(names))
+    dynamic_file.write_text(DYNAMIC_PAGE.format(params=params))
+
+    (directory / "src/pages/layout.py").write_text(LAYOUT_PAGE)
+    (directory / "src/pages/form.py").write_text(FORM_PAGE)
+
+    # Each provider depends on the previous one, the worst case for ordering
+    for index in range(providers):
+        imports = f"from src.providers.provider{index - 1} import Context{index - 1}" if index else ""
+        dependencies = f"Context{index - 1}" if index else ""
+        (directory / f"src/providers/provider{index}.py").write_text(
+            PROVIDER.format(index=index, imports=imports, dependencies=dependencies)
+        )
+
+    return "/deep/" + "/".join(f"v{level}" for level in range(depth))
+
+
+def percentile(values: list[float], fraction: float):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def run_worker(directory: Path, mode: str, options: dict):
+    env = {**os.environ, "PYTHONPATH": str(ROOT), "LIKULAU_BENCH": json.dumps(options)}
+    result = subprocess.run(
+        [sys.executable, str(Path(__file__).resolve()), "--worker", mode],
+        cwd=directory,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"{mode} benchmark failed:\n{result.stderr}")
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+# Everything below runs inside the worker processes
+
+
+def create_scope(method: str, path: str, query_string: bytes = b"", headers=()):
+    return {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": query_string,
+        "headers": [(b"host", b"bench"), *headers],
+        "server": ("bench", 80),
+        "client": ("bench", 1234),
+    }
+
+
+async def call(app, scope: dict, body: bytes = b""):
+    received = False
+    status = 0
+
+    async def receive():
+        nonlocal received
+        if not received:
+            received = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        # Like a server, nothing else arrives until the client disconnects
+        await asyncio.Future()
+
+    async def send(message):
+        nonlocal status
+        if message["type"] == "http.response.start":
+            status = message["status"]
+
+    await app(dict(scope), receive, send)
+    return status
+
+
+def create_requests(dynamic_path: str):
+    from likulau._internal.form_rpc import get_rpc_endpoint
+    from src.pages import form  # type: ignore
+
+    rpc_query = get_rpc_endpoint(form.submit).removeprefix("?").encode()
+    form_headers = [(b"content-type", b"application/x-www-form-urlencoded")]
+    return {
+        "static": (create_scope("GET", "/page0"), b""),
+        "dynamic": (create_scope("GET", dynamic_path), b""),
+        "layout": (create_scope("GET", "/layout"), b""),
+        "rpc": (create_scope("POST", "/form", rpc_query, form_headers), b"name=bench"),
+    }
+
+
+async def measure_requests(app, scope: dict, body: bytes, requests: int, concurrency: int):
+    latencies: list[float] = []
+    errors = 0
+
+    async def client(count: int):
+        nonlocal errors
+        for _ in range(count):
+            start = time.perf_counter()
+            status = await call(app, scope, body)
+            latencies.append(time.perf_counter() - start)
+            if status != 200:
+                errors += 1
+
+    # Warm up imports, caches and thread pools first
+    await asyncio.gather(*(call(app, scope, body) for _ in range(concurrency)))
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client(requests // concurrency) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": len(latencies) / elapsed,
+        "latency_ms": {
+            "p50": percentile(latencies, 0.50) * 1000,
+            "p90": percentile(latencies, 0.90) * 1000,
+            "p99": percentile(latencies, 0.99) * 1000,
+            "max": max(latencies) * 1000,
+        },
+    }
+
+
+async def measure_memory(app, scope: dict, body: bytes, concurrency: int, batches: int = 10):
+    tracemalloc.start()
+    try:
+        await asyncio.gather(*(call(app, scope, body) for _ in range(concurrency)))
+        baseline, _ = tracemalloc.get_traced_memory()
+
+        per_request: list[float] = []
+        for _ in range(batches):
+            tracemalloc.reset_peak()
+            current, _ = tracemalloc.get_traced_memory()
+            await asyncio.gather(*(call(app, scope, body) for _ in range(concurrency)))
+            _, peak = tracemalloc.get_traced_memory()
+            per_request.append((peak - current) / concurrency)
+
+        retained, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "peak_bytes_per_request": statistics.median(per_request),
+        "retained_bytes": retained - baseline,
+    }
+
+
+async def serve_worker(options: dict):
+    from likulau.app import create_app
+
+    app = create_app(isr=False, lazy=False)
+    requests = create_requests(options["dynamic_path"])
+    results = {}
+    async with app.router.lifespan_context(app):
+        for scenario, (scope, body) in requests.items():
+            results[scenario] = await measure_requests(
+                app, scope, body, options["requests"], options["concurrency"]
+            )
+            results[scenario]["memory"] = await measure_memory(
+                app, scope, body, options["concurrency"]
+            )
+    return results
+
+
+def startup_worker(options: dict):
+    start = time.perf_counter()
+    from likulau.app import create_app
+
+    create_app(lazy=options["lazy"])
+    return {"startup_seconds": time.perf_counter() - start}
+
+
+def build_worker(options: dict):
+    from likulau._internal.build import build_app
+    from likulau._internal.console import console
+
+    console.quiet = True
+    target = Path(tempfile.mkdtemp(prefix="likulau-build-"))
+    try:
+        start = time.perf_counter()
+        asyncio.run(build_app(target, options["concurrency"], incremental=False))
+        full = time.perf_counter() - start
+
+        start = time.perf_counter()
+        asyncio.run(build_app(target, options["concurrency"], incremental=True))
+        unchanged = time.perf_counter() - start
+
+        pages = len(list(target.glob("**/index.html")))
+    finally:
+        shutil.rmtree(target)
+
+    return {
+        "pages": pages,
+        "full_seconds": full,
+        "pages_per_second": pages / full,
+        "unchanged_seconds": unchanged,
+    }
+
+
+def worker(mode: str):
+    options = json.loads(os.environ["LIKULAU_BENCH"])
+    sys.path.insert(0, ".")
+    if mode == "serve":
+        result = asyncio.run(serve_worker(options))
+    elif mode == "startup":
+        result = startup_worker(options)
+    else:
+        result = build_worker(options)
+    print(json.dumps(result))
+
+
+# Everything below runs in the main process
+
+
+def git_commit():
+    result = subprocess.run(
+        ["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True
+    )
+    return result.stdout.strip() or None
+
+
+def flatten(value, prefix: str = ""):
+    if isinstance(value, dict):
+        for key, child in value.items():
+            yield from flatten(child, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(value, (int, float)):
+        yield prefix, value
+
+
+def compare(results: dict, baseline_file: Path):
+    baseline = dict(flatten(json.loads(baseline_file.read_text())["results"]))
+    print(f"\n{'metric':<60}{'baseline':>14}{'current':>14}{'ratio':>8}", file=sys.stderr)
+    for name, value in flatten(results["results"]):
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        print(f"{name:<60}{previous:>14.3f}{value:>14.3f}{value / previous:>7.2f}x", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--pages", type=int, default=50, help="Flat pages per app")
+    parser.add_argument("--depth", type=int, default=6, help="Parameters of the dynamic route")
+    parser.add_argument("--providers", type=int, default=8, help="Providers of the second app")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", type=Path, help="Where to write the results")
+    parser.add_argument("--compare", type=Path, help="Previous results to compare against")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        return worker(args.worker)
+
+    results: dict = {}
+    for name, providers in (("no_providers", 0), ("providers", args.providers)):
+        with tempfile.TemporaryDirectory(prefix="likulau-bench-") as directory:
+            app_directory = Path(directory)
+            dynamic_path = generate_app(app_directory, args.pages, args.depth, providers)
+            options = {
+                "dynamic_path": dynamic_path,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+            }
+
+            print(f"[*] Benchmarking {name}", file=sys.stderr)
+            startup = run_worker(app_directory, "startup", {**options, "lazy": False})
+            # The build also writes the route manifest used by the next startup
+            build = run_worker(app_directory, "build", options)
+            startup_manifest = run_worker(app_directory, "startup", {**options, "lazy": True})
+            requests = run_worker(app_directory, "serve", options)
+
+            results[name] = {
+                "startup_seconds": startup["startup_seconds"],
+                "startup_manifest_seconds": startup_manifest["startup_seconds"],
+                "build": build,
+                "requests": requests,
+            }
+
+            for scenario in SCENARIOS:
+                result = requests[scenario]
+                print(
+                    f"    {scenario:<10}{result['throughput_rps']:>10.0f} req/s"
+                    f"  p50 {result['latency_ms']['p50']:.2f}ms"
+                    f"  p99 {result['latency_ms']['p99']:.2f}ms"
+                    f"  {result['memory']['peak_bytes_per_request'] / 1024:.1f} KiB/request",
+                    file=sys.stderr,
+                )
+
+    output = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "config": {
+                "pages": args.pages,
+                "depth": args.depth,
+                "providers": args.providers,
+                "requests": args.requests,
+                "concurrency": args.concurrency,
+            },
+        },
+        "results": results,
+    }
+
+    text = json.dumps(output, indent=2)
+    if args.output:
+        args.output.write_text(text)
+    else:
+        print(text)
+
+    if args.compare:
+        compare(output, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""Serialization time of a page whose shell is rebuilt on every request, against one
+whose unchanging parts are serialized ahead of time with static(), and of a liku.htm
+template rendered as is against the compiled one, when liku.htm is installed.
+
+Usage: python benchmarks/templates.py [iterations]
+"""
+
+import sys
+import time
+
+import liku as e
+
+sys.path.insert(0, ".")
+
+from likulau.templates import html, static, static_component  # noqa: E402
+from likulau._internal.templates import htm_html  # noqa: E402
+
+
+def navigation():
+    links = [
+        e.li(children=[e.a(props={"href": f"/section/{n}"}, children=f"Section {n}")])
+        for n in range(30)
+    ]
+    return e.nav(children=[e.ul(children=links)])
+
+
+def footer():
+    return e.footer(children=[e.p(children=f"Footer line {n}") for n in range(30)])
+
+
+@static_component()
+def cached_footer(year: int):
+    return footer()
+
+
+STATIC_NAVIGATION = static(navigation())
+
+
+def page(user: str, shell: tuple):
+    nav, foot = shell
+    return e.html(
+        children=[
+            e.head(children=[e.title(children=f"Hello {user}")]),
+            e.body(children=[nav, e.main(children=[e.h1(children=f"Hello {user}!")]), foot]),
+        ]
+    )
+
+
+TEMPLATE = (
+    "<main><nav><ul>"
+    + "".join(f'<li><a href="/section/{n}">Section {n}</a></li>' for n in range(30))
+    + "</ul></nav><h1>Hello {{user}}!</h1><footer>"
+    + "".join(f"<p>Footer line {n}</p>" for n in range(30))
+    + "</footer></main>"
+)
+
+
+def template_page(render, user: str):
+    return render(TEMPLATE)
+
+
+def measure(build_shell, iterations: int):
+    start = time.perf_counter()
+    for index in range(iterations):
+        str(page(f"user{index}", build_shell()))
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main(iterations: int):
+    scenarios = {
+        "rebuilt": lambda: (navigation(), footer()),
+        "static": lambda: (STATIC_NAVIGATION, cached_footer(2024)),
+    }
+    if str(page("x", scenarios["rebuilt"]())) != str(page("x", scenarios["static"]())):
+        raise AssertionError("Static output differs from the rebuilt one")
+
+    baseline = None
+    print(f"{'shell':<10}{'us/page':>10}{'speedup':>10}")
+    for name, build_shell in scenarios.items():
+        timing = measure(build_shell, iterations)
+        baseline = baseline or timing
+        print(f"{name:<10}{timing:>10.1f}{baseline / timing:>9.2f}x")
+
+    if htm_html is None:
+        return
+    if str(template_page(htm_html, "x")) != str(template_page(html, "x")):
+        raise AssertionError("Compiled template output differs from liku.htm")
+
+    baseline = None
+    print(f"\n{'template':<10}{'us/page':>10}{'speedup':>10}")
+    for name, render in {"liku.htm": htm_html, "compiled": html}.items():
+        start = time.perf_counter()
+        for index in range(iterations):
+            str(template_page(render, f"user{index}"))
+        timing = (time.perf_counter() - start) / iterations * 1e6
+        baseline = baseline or timing
+        print(f"{name:<10}{timing:>10.1f}{baseline / timing:>9.2f}x")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
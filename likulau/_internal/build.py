@@ -1,31 +1,177 @@
+import hashlib
+import json
+import sys
+from dataclasses import dataclass
 from pathlib import Path
-from starlette.testclient import TestClient
+from types import ModuleType
+from typing import Any
+
+import anyio
+import httpx
+from starlette.applications import Starlette
 from starlette.routing import Route
 
+from likulau._internal import providers
+from likulau._internal.compression import (
+    remove_compressed_siblings,
+    supported_encodings,
+    write_compressed_siblings,
+)
 from likulau._internal.console import console
+from likulau._internal.imports import ImportGraph, module_name, snapshot
 from likulau._internal.routes import LikulauRoute
-from likulau._internal.utils import run_async
+from likulau._internal.utils import output_file, run_async
 from likulau.app import create_app
 
+MANIFEST_FILE = ".likulau-build.json"
+MANIFEST_VERSION = 1
+DEFAULT_CONCURRENCY = 16
+
+
+@dataclass
+class BuildTarget:
+    url: str
+    params: dict[str, Any]
+    route: Route
+    sources: dict[str, str]
+
+
+_file_hashes: dict[tuple[Path, int], str] = {}
+
+
+def _hash_file(path: Path):
+    key = (path, path.stat().st_mtime_ns)
+    if key not in _file_hashes:
+        _file_hashes[key] = hashlib.sha256(path.read_bytes()).hexdigest()
+    return _file_hashes[key]
+
+
+def _module_file(module_name: str):
+    module = sys.modules.get(module_name)
+    if not module or not getattr(module, "__file__", None):
+        return None
+    return Path(module.__file__).resolve()  # type: ignore
+
+
+def _route_sources(likulau_route: LikulauRoute, graph: ImportGraph, mtimes: dict[Path, int]):
+    """Hashes of every project source file the output of a route depends on.
+
+    That is the page module, project modules it imports from, all providers and src/app.py,
+    along with every project module those import in turn.
+    """
+    page_module = likulau_route.page_func.__module__
+    module_names = {page_module}
+    for obj in vars(sys.modules[page_module]).values():
+        if isinstance(obj, ModuleType):
+            module_names.add(obj.__name__)
+        elif isinstance(getattr(obj, "__module__", None), str):
+            module_names.add(obj.__module__)
+
+    for provider in providers.app_providers.values():
+        module_names.add(provider.provider.__module__)
+    module_names.add("src.app")
+
+    module_names = {name for name in module_names if name == "src" or name.startswith("src.")}
+    module_names = graph.dependencies(module_names, mtimes)
+
+    files = {module_name(path): path.resolve() for path in mtimes}
+    cwd = Path.cwd().resolve()
+    sources: dict[str, str] = {}
+    for name in module_names:
+        path = files.get(name) or _module_file(name)
+        if path and path.exists():
+            sources[str(path.relative_to(cwd))] = _hash_file(path)
+    return dict(sorted(sources.items()))
 
-async def request_route(client: TestClient, route: Route, likulau_route: LikulauRoute):
-    if not likulau_route.static_paths_func and len(route.param_convertors) != 0:
-        console.print("    [yellow]Skipped because no get_static_paths() while having required arguments")
+
+def load_build_manifest(target_directory: Path) -> dict[str, Any]:
+    manifest_file = target_directory / MANIFEST_FILE
+    if not manifest_file.exists():
+        return {}
+
+    manifest = json.loads(manifest_file.read_text())
+    if manifest.get("version") != MANIFEST_VERSION:
+        return {}
+    return manifest
+
+
+def _remove_output(target_directory: Path, output: Path):
+    if not output.exists():
         return
 
-    if likulau_route.static_paths_func:
-        all_params = await run_async(likulau_route.static_paths_func)
-    else:
-        all_params = [{}]
-    for params in all_params:
-        urlpath = route.url_path_for(route.name, **params)
-        yield (urlpath, client.get(urlpath))
+    output.unlink()
+    remove_compressed_siblings(output)
+    parent = output.parent
+    while parent != target_directory and not any(parent.iterdir()):
+        parent.rmdir()
+        parent = parent.parent
+
+
+def build_static(target_directory: Path, previous: dict[str, str]):
+    """Copies static/ into the build along with compressed versions of each file,
+    skipping files whose content did not change."""
+    assets: dict[str, str] = {}
+    source_directory = Path("static")
+    if source_directory.is_dir():
+        for source in sorted(source_directory.rglob("*")):
+            if not source.is_file():
+                continue
+
+            name = source.as_posix()
+            content = source.read_bytes()
+            content_hash = hashlib.sha256(content).hexdigest()
+            assets[name] = content_hash
 
+            target_file = target_directory / name
+            if previous.get(name) == content_hash and target_file.exists():
+                continue
+
+            target_file.parent.mkdir(parents=True, exist_ok=True)
+            target_file.write_bytes(content)
+            write_compressed_siblings(target_file)
+            console.print(f"    [green][*] Asset {name} copied to {target_file}")
+
+    for name in previous:
+        if name not in assets:
+            _remove_output(target_directory, target_directory / name)
+            console.print(f"    [yellow][*] Removed stale asset {name}")
+
+    return assets
 
-async def build_app(target_directory: Path):
-    app = create_app()
-    client = TestClient(app)
 
+async def build_error_pages(app: Starlette, target_directory: Path, previous: dict[str, Any]):
+    """Writes static error pages as <status code>.html."""
+    errors: dict[str, Any] = {}
+    for code, handler in app.exception_handlers.items():
+        prerender = getattr(handler, "_likulau_prerender", None)
+        if not prerender:
+            continue
+
+        html = await prerender()
+        if html is None:
+            continue
+
+        content = html.encode()
+        target_file = target_directory / f"{code}.html"
+        target_file.write_bytes(content)
+        write_compressed_siblings(target_file)
+        errors[str(code)] = {
+            "file": target_file.name,
+            "hash": hashlib.sha256(content).hexdigest(),
+        }
+        console.print(f"    [green][*] Error page {code} built to {target_file}")
+
+    for code, entry in previous.items():
+        if code not in errors:
+            _remove_output(target_directory, target_directory / entry["file"])
+
+    return errors
+
+
+async def collect_targets(app: Starlette):
+    targets: list[BuildTarget] = []
+    graph = ImportGraph()
+    mtimes = snapshot()
     for route in app.routes:
         if not isinstance(route, Route):
             console.print("[yellow]Skipping non starlette Route paths")
@@ -39,22 +185,118 @@ async def build_app(target_directory: Path):
             console.print(f"[yellow]Cannot find route information for {route.path}, skipping.")
             continue
 
-        console.print(f"[*] Building {route.path}")
-        async for path, response in request_route(client, route, route_info):
-            orig_path = path
-            path = path.lstrip("/").rstrip("/")
-            target_file = target_directory.joinpath(path).resolve()
-            if not target_file.is_relative_to(target_directory):
-                raise ValueError("Path is invalid")
+        if not route_info.static_paths_func and len(route.param_convertors) != 0:
+            console.print(
+                f"[yellow]Skipped {route.path} because no get_static_paths() while having required arguments"
+            )
+            continue
 
-            target_file = target_file / "index.html"
-            target_file.parent.mkdir(parents=True, exist_ok=True)
-            response.raise_for_status()
+        if route_info.static_paths_func:
+            all_params = await run_async(route_info.static_paths_func)
+        else:
+            all_params = [{}]
+
+        sources = _route_sources(route_info, graph, mtimes)
+        for params in all_params:
+            url = route.url_path_for(route.name, **params)
+            targets.append(BuildTarget(url, params, route, sources))
+
+    return targets
+
+
+def _is_fresh(target: BuildTarget, entry: dict[str, Any] | None, target_file: Path):
+    if not entry or not target_file.exists():
+        return False
+
+    params = json.loads(json.dumps(target.params, default=str))
+    return (
+        entry["route"] == target.route.path
+        and entry["params"] == params
+        and entry["sources"] == target.sources
+    )
+
+
+async def build_target(
+    client: httpx.AsyncClient,
+    target: BuildTarget,
+    target_directory: Path,
+):
+    target_file = output_file(target_directory, target.url)
+    response = await client.get(target.url)
+    response.raise_for_status()
+
+    target_file.parent.mkdir(parents=True, exist_ok=True)
+    target_file.write_bytes(response.content)
+    write_compressed_siblings(target_file)
+    console.print(f"    [green][*] Page {target.url} built to {target_file}")
+
+    return {
+        "route": target.route.path,
+        "params": target.params,
+        "file": target_file.relative_to(target_directory).as_posix(),
+        "hash": hashlib.sha256(response.content).hexdigest(),
+        "sources": target.sources,
+    }
+
+
+async def build_app(
+    target_directory: Path,
+    concurrency: int = DEFAULT_CONCURRENCY,
+    incremental: bool = True,
+):
+    # Pages have to actually be rendered, not served from an earlier build, and
+    # every module has to be loaded to know what the pages depend on
+    app = create_app(isr=False, lazy=False)
+    previous_manifest = load_build_manifest(target_directory) if incremental else {}
+    previous: dict[str, Any] = previous_manifest.get("pages", {})
+    pages: dict[str, Any] = {}
+
+    if "br" not in supported_encodings():
+        console.print("[yellow]brotli is not installed, only writing .gz files. Install likulau[brotli] for .br files")
+
+    transport = httpx.ASGITransport(app=app)  # type: ignore
+    # Pages redirecting elsewhere are built with what they redirect to
+    async with app.router.lifespan_context(app), httpx.AsyncClient(
+        transport=transport, base_url="http://likulau", follow_redirects=True
+    ) as client:
+        targets = await collect_targets(app)
+        console.print(f"[*] Building {len(targets)} pages")
+
+        limiter = anyio.CapacityLimiter(concurrency)
+
+        async def build_one(target: BuildTarget):
+            async with limiter:
+                pages[target.url] = await build_target(client, target, target_directory)
+
+        async with anyio.create_task_group() as tg:
+            for target in targets:
+                entry = previous.get(target.url)
+                if _is_fresh(target, entry, output_file(target_directory, target.url)):
+                    pages[target.url] = entry
+                    continue
+
+                tg.start_soon(build_one, target)
+
+        errors = await build_error_pages(app, target_directory, previous_manifest.get("errors", {}))
+
+    skipped = sum(1 for url, entry in pages.items() if previous.get(url) is entry)
+    if skipped:
+        console.print(f"[*] {skipped} pages are unchanged, skipped")
+
+    for url, entry in previous.items():
+        if url in pages:
+            continue
 
-            assert not target_file.exists()
-            with open(target_file, "wb") as fwrite:
-                fwrite.write(response.content)
+        _remove_output(target_directory, target_directory / entry["file"])
+        console.print(f"    [yellow][*] Removed stale page {url}")
 
-            console.print(f"    [green][*] Page {orig_path} built to {target_file}")
+    assets = build_static(target_directory, previous_manifest.get("assets", {}))
 
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "pages": dict(sorted(pages.items())),
+        "assets": assets,
+        "errors": errors,
+    }
+    (target_directory / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2, default=str))
     console.print("[green][*] Finished!")
@@ -0,0 +1,175 @@
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Awaitable, Callable
+
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from likulau._internal.fragments import FRAGMENT_HEADER, requested_fragment
+
+if TYPE_CHECKING:
+    from likulau._internal.routes import LikulauRoute
+
+CACHE_HEADER = "x-likulau-cache"
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+@dataclass(frozen=True)
+class CachePolicy:
+    ttl: float
+    query: list[str] = field(default_factory=list)
+    headers: list[str] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class CacheStats:
+    hits: int
+    misses: int
+
+
+class CacheBackend(ABC):
+    """Storage for cached responses.
+
+    Values are opaque bytes, so a backend shared between workers only has to store
+    them with an expiry.
+    """
+
+    @abstractmethod
+    async def get(self, key: str) -> bytes | None:
+        raise NotImplementedError  # pragma: nocover
+
+    @abstractmethod
+    async def set(self, key: str, value: bytes, ttl: float) -> None:
+        raise NotImplementedError  # pragma: nocover
+
+
+class MemoryCache(CacheBackend):
+    """In-process LRU cache, bounded by the total size of the stored values."""
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.entries: OrderedDict[str, tuple[bytes, float]] = OrderedDict()
+
+    def _remove(self, key: str):
+        value, _ = self.entries.pop(key)
+        self.size -= len(value)
+
+    async def get(self, key: str):
+        entry = self.entries.get(key)
+        if not entry:
+            return None
+
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._remove(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value
+
+    async def set(self, key: str, value: bytes, ttl: float):
+        if key in self.entries:
+            self._remove(key)
+
+        if len(value) > self.max_bytes:
+            return
+
+        self.entries[key] = (value, time.monotonic() + ttl)
+        self.size += len(value)
+        while self.size > self.max_bytes:
+            self._remove(next(iter(self.entries)))
+
+
+def _is_cacheable(response: Response, policy: CachePolicy):
+    """Whether response can be served to anyone requesting the same key."""
+    if response.status_code != 200 or isinstance(response, StreamingResponse):
+        return False
+
+    # Cookies belong to whoever the response was rendered for
+    if "set-cookie" in response.headers:
+        return False
+
+    cache_control = response.headers.get("cache-control", "").lower()
+    directives = {directive.split("=", 1)[0].strip() for directive in cache_control.split(",")}
+    if directives & {"private", "no-store"}:
+        return False
+
+    # Headers the response varies on must be part of the key
+    covered = {name.lower() for name in policy.headers} | {FRAGMENT_HEADER}
+    for vary in response.headers.getlist("vary"):
+        for name in vary.split(","):
+            name = name.strip().lower()
+            if name and name not in covered:
+                return False
+    return True
+
+
+def dump_response(response: Response):
+    meta = {"status_code": response.status_code, "headers": response.headers.items()}
+    return json.dumps(meta).encode() + b"\n" + response.body
+
+
+def load_response(value: bytes):
+    meta, body = value.split(b"\n", 1)
+    meta = json.loads(meta)
+    response = Response(body, status_code=meta["status_code"])
+    response.raw_headers = [(k.encode("latin-1"), v.encode("latin-1")) for k, v in meta["headers"]]
+    return response
+
+
+class ResponseCache:
+    def __init__(self, route: "LikulauRoute", policy: CachePolicy, backend: CacheBackend):
+        self.route = route
+        self.policy = policy
+        self.backend = backend
+        self.hits = 0
+        self.misses = 0
+        response_caches[route.path] = self
+
+    def stats(self):
+        return CacheStats(self.hits, self.misses)
+
+    def key(self, request: Request):
+        parts = {
+            "path": sorted(request.path_params.items()),
+            "query": [(name, request.query_params.getlist(name)) for name in self.policy.query],
+            "headers": [(name, request.headers.get(name)) for name in self.policy.headers],
+            "fragment": requested_fragment(request),
+        }
+        return f"likulau:{self.route.path}:{json.dumps(parts, default=str)}"
+
+
+response_caches: dict[str, ResponseCache] = {}
+
+
+def with_response_cache(
+    route: "LikulauRoute",
+    handler: Callable[[Request], Awaitable[Response]],
+    backend: CacheBackend,
+):
+    cache = ResponseCache(route, route.cache, backend)  # type: ignore
+
+    async def inner(request: Request):
+        if request.method not in ("GET", "HEAD"):
+            return await handler(request)
+
+        key = cache.key(request)
+        value = await backend.get(key)
+        if value is not None:
+            cache.hits += 1
+            response = load_response(value)
+            response.headers[CACHE_HEADER] = "HIT"
+            return response
+
+        cache.misses += 1
+        response = await handler(request)
+        if _is_cacheable(response, cache.policy):
+            await backend.set(key, dump_response(response), cache.policy.ttl)
+        response.headers[CACHE_HEADER] = "MISS"
+        return response
+
+    return inner
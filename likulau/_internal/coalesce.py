@@ -0,0 +1,58 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable
+
+from starlette.requests import Request
+
+
+@dataclass(frozen=True)
+class CoalescePolicy:
+    key: Callable[[Request], str] | None = None
+    timeout: float | None = None
+
+
+def _consume_exception(task: asyncio.Task):
+    # Every waiter may have given up already, do not log the error as unretrieved
+    if not task.cancelled():
+        task.exception()
+
+
+class SingleFlight:
+    """Shares one in-flight call between every caller using the same key."""
+
+    def __init__(self):
+        self.calls: dict[str, asyncio.Task] = {}
+
+    def _forget(self, key: str, task: asyncio.Task):
+        if self.calls.get(key) is task:
+            del self.calls[key]
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]], timeout: float | None = None):
+        task = self.calls.get(key)
+        if not task:
+            # Run as its own task, so the caller that started it going away does not
+            # cancel the call for everyone else.
+            task = asyncio.ensure_future(func())
+            task.add_done_callback(_consume_exception)
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.calls[key] = task
+
+        return await asyncio.wait_for(asyncio.shield(task), timeout)
+
+
+def coalesced(
+    path: str,
+    func: Callable[[Request], Awaitable[Any]],
+    policy: CoalescePolicy,
+):
+    flight = SingleFlight()
+
+    async def inner(request: Request):
+        if policy.key:
+            key = policy.key(request)
+        else:
+            key = repr(sorted(request.path_params.items()))
+
+        return await flight.do(f"{path}:{key}", lambda: func(request), policy.timeout)
+
+    return inner
@@ -0,0 +1,181 @@
+import gzip
+import zlib
+from pathlib import Path
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # pragma: nocover
+    brotli = None
+
+DEFAULT_MINIMUM_SIZE = 500
+# Formats that are already compressed, compressing them again is wasted effort
+INCOMPRESSIBLE_SUFFIXES = {
+    ".br", ".gz", ".zip", ".png", ".jpg", ".jpeg", ".gif", ".webp", ".avif",
+    ".ico", ".woff", ".woff2", ".mp3", ".mp4", ".webm", ".ogg", ".pdf",
+}
+
+
+def supported_encodings():
+    """Encodings likulau can produce, most preferred first."""
+    if brotli:
+        return ["br", "gzip"]
+    return ["gzip"]
+
+
+def _quality(params: list[str]):
+    for param in params:
+        name, _, value = param.partition("=")
+        if name.strip().lower() == "q":
+            try:
+                return float(value)
+            except ValueError:
+                return 0.0
+    return 1.0
+
+
+def accepted_encodings(headers: Headers):
+    """Supported encodings the client accepts, the one it prefers most first.
+
+    Encodings with q=0 are refused, ties are broken by supported_encodings().
+    """
+    qualities: dict[str, float] = {}
+    for part in headers.get("accept-encoding", "").split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if name:
+            qualities[name] = _quality(params)
+
+    wildcard = qualities.get("*", 0.0)
+    accepted = [
+        encoding
+        for encoding in supported_encodings()
+        if qualities.get(encoding, wildcard) > 0
+    ]
+    # Stable, so equally preferred encodings keep our order
+    return sorted(accepted, key=lambda encoding: -qualities.get(encoding, wildcard))
+
+
+def accepted_encoding(headers: Headers):
+    encodings = accepted_encodings(headers)
+    return encodings[0] if encodings else None
+
+
+def compress(content: bytes, encoding: str):
+    if encoding == "br":
+        return brotli.compress(content)  # type: ignore
+    return gzip.compress(content, compresslevel=9, mtime=0)
+
+
+def write_compressed_siblings(path: Path):
+    """Writes .br and .gz versions of path next to it, when they end up smaller."""
+    written: list[Path] = []
+    if path.suffix in INCOMPRESSIBLE_SUFFIXES:
+        return written
+
+    content = path.read_bytes()
+    suffixes = {"br": ".br", "gzip": ".gz"}
+    for encoding in supported_encodings():
+        sibling = path.with_name(path.name + suffixes[encoding])
+        compressed = compress(content, encoding)
+        if len(compressed) >= len(content):
+            sibling.unlink(missing_ok=True)
+            continue
+
+        sibling.write_bytes(compressed)
+        written.append(sibling)
+    return written
+
+
+def remove_compressed_siblings(path: Path):
+    for suffix in (".br", ".gz"):
+        path.with_name(path.name + suffix).unlink(missing_ok=True)
+
+
+class _Compressor:
+    def __init__(self, encoding: str):
+        self.encoding = encoding
+        if encoding == "br":
+            self.compressor = brotli.Compressor()  # type: ignore
+        else:
+            self.compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def process(self, data: bytes):
+        # Flush on every chunk so streamed responses still arrive incrementally
+        if self.encoding == "br":
+            return self.compressor.process(data) + self.compressor.flush()
+        return self.compressor.compress(data) + self.compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        if self.encoding == "br":
+            return self.compressor.finish()
+        return self.compressor.flush()
+
+
+class CompressionMiddleware:
+    """Compresses responses with brotli or gzip, as they are being sent.
+
+    Responses smaller than minimum_size, or that are already encoded, are left alone.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = DEFAULT_MINIMUM_SIZE):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        encoding = accepted_encoding(Headers(scope=scope))
+        if not encoding:
+            return await self.app(scope, receive, send)
+
+        start_message: Message | None = None
+        compressor: _Compressor | None = None
+
+        async def wrapped_send(message: Message):
+            nonlocal start_message, compressor
+            if message["type"] == "http.response.start":
+                # Held back until the first body chunk tells whether to compress
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                return await send(message)
+
+            body = message.get("body", b"")
+            more_body = message.get("more_body", False)
+            if start_message:
+                headers = MutableHeaders(raw=start_message["headers"])
+                if "content-encoding" in headers or (
+                    not more_body and len(body) < self.minimum_size
+                ):
+                    await send(start_message)
+                    start_message = None
+                    return await send(message)
+
+                compressor = _Compressor(encoding)
+                headers["content-encoding"] = encoding
+                headers.add_vary_header("Accept-Encoding")
+                del headers["content-length"]
+                if not more_body:
+                    body = compressor.process(body) + compressor.finish()
+                    headers["content-length"] = str(len(body))
+
+                await send(start_message)
+                start_message = None
+                if not more_body:
+                    return await send({"type": "http.response.body", "body": body})
+                body = compressor.process(body)
+            elif not compressor:
+                return await send(message)
+            else:
+                body = compressor.process(body)
+
+            if not more_body:
+                body += compressor.finish()
+            await send({"type": "http.response.body", "body": body, "more_body": more_body})
+
+        await self.app(scope, receive, wrapped_send)
@@ -1,30 +1,35 @@
+import asyncio
+import contextvars
 import importlib
 import typing
-from pathlib import Path
+from contextlib import asynccontextmanager
+from types import ModuleType
 from typing import Any
 
+import anyio
 import liku
 from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, Response
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 
 from likulau.hooks import ExceptionContext, RequestContext
 from likulau.types import ErrorHandlerFunction
-from likulau._internal.utils import run_async
+from likulau._internal.form_rpc import register_module_rpcs
+from likulau._internal.streaming import iter_html
+from likulau._internal.templates import compile_module_templates
+from likulau._internal.utils import iter_modules, run_async
 
 
-def discover_error_handlers():
-    handlers: dict[str | int, Any] = {}
-    for page in Path("src/errors").glob("**/*.py"):
-        page = page.with_suffix("")
-        module = ".".join(page.parts)
+def _load_error_handler(page_mod: ModuleType, validate: bool = True):
+    if not hasattr(page_mod, "handler"):
+        raise Exception(
+            f"Cannot find handler function for exception handler {page_mod.__name__}"
+        )
 
-        page_mod = importlib.import_module(module)
-        if not hasattr(page_mod, "handler"):
-            raise Exception(
-                f"Cannot find handler function for exception handler {page_mod.__name__}"
-            )
+    register_module_rpcs(page_mod, validate)
+    compile_module_templates(page_mod)
 
+    if validate:
         types = typing.get_type_hints(page_mod.handler)
         # TODO: Is there any way for us to check the distribution better?
         if types.get("return") not in (
@@ -36,14 +41,80 @@ def discover_error_handlers():
                 f"{page_mod.__name__}.page() does not have correct return type."
                 f"Expected HTMLElement | Response, got {types.get('return')}"
             )
-        page_func = create_error_handler(page_mod.handler)
 
-        handlers[int(page.stem)] = page_func
+    return create_error_handler(page_mod.handler, getattr(page_mod, "static", False))
+
+
+def discover_error_handlers():
+    handlers: dict[str | int, Any] = {}
+    for page, module in iter_modules("src/errors"):
+        page_mod = importlib.import_module(module)
+        handlers[int(page.stem)] = _load_error_handler(page_mod)
     return handlers
 
 
-def create_error_handler(func: ErrorHandlerFunction):
+def create_lazy_error_handler(module: str):
+    """Creates an error handler whose module is only imported once it is needed.
+
+    Returns the handler, along with a function that loads it ahead of time.
+    """
+    handler = None
+
+    def load():
+        nonlocal handler
+        if not handler:
+            handler = _load_error_handler(importlib.import_module(module), validate=False)
+
     async def exception_handler(request: Request, exception: HTTPException):
+        if not handler:
+            load()
+        return await handler(request, exception)  # type: ignore
+
+    async def prerender():
+        # Whether the page is static is only known once its module is imported
+        load()
+        loaded = getattr(handler, "_likulau_prerender", None)
+        return await loaded() if loaded else None
+
+    exception_handler._likulau_prerender = prerender  # type: ignore (intended for app builder)
+    return exception_handler, load
+
+
+async def _render_without_request(func: ErrorHandlerFunction):
+    # In a blank context, so handlers that read the request or exception fail instead
+    # of seeing whatever happens to be set
+    return await asyncio.create_task(run_async(func), context=contextvars.Context())
+
+
+def create_error_handler(func: ErrorHandlerFunction, static: bool = False):
+    """Creates the exception handler of an error page.
+
+    Handlers of modules declaring `static = True` are rendered once, without the
+    request or exception, and served from memory afterwards.
+    """
+    if hasattr(func, "_streaming"):
+        return create_streaming_error_handler(func)
+
+    rendered: str | None = None
+    lock = anyio.Lock()
+
+    async def prerender():
+        nonlocal rendered
+        async with lock:
+            if rendered is None:
+                response = await _render_without_request(func)
+                if not isinstance(response, liku.HTMLElement):
+                    raise TypeError(
+                        f"Static error handler must return HTMLElement, got {type(response)}"
+                    )
+                rendered = str(response)
+        return rendered
+
+    async def exception_handler(request: Request, exception: HTTPException):
+        if static:
+            html = rendered if rendered is not None else await prerender()
+            return HTMLResponse(html, status_code=exception.status_code)
+
         with RequestContext.provide(request), ExceptionContext.provide(exception):
             response = await run_async(func)
             if isinstance(response, liku.HTMLElement):
@@ -52,4 +123,49 @@ def create_error_handler(func: ErrorHandlerFunction):
             response.status_code = exception.status_code
             return response
 
+    if static:
+        exception_handler._likulau_prerender = prerender  # type: ignore (intended for app builder)
+    return exception_handler
+
+
+async def prerender_error_pages(handlers: dict[Any, Any]):
+    for handler in list(handlers.values()):
+        prerender = getattr(handler, "_likulau_prerender", None)
+        if prerender:
+            await prerender()
+
+
+def with_static_error_pages(lifespan):
+    """Wraps a Starlette lifespan to render static error pages before serving."""
+
+    @asynccontextmanager
+    async def inner(app):
+        await prerender_error_pages(app.exception_handlers)
+        async with lifespan(app) as state:
+            yield state
+
+    return inner
+
+
+def create_streaming_error_handler(func: ErrorHandlerFunction):
+    chunk_size: int = func._streaming  # type: ignore
+
+    async def body(request: Request, exception: HTTPException):
+        with RequestContext.provide(request), ExceptionContext.provide(exception):
+            response = await run_async(func)
+            if not isinstance(response, liku.HTMLElement):
+                raise TypeError(
+                    f"Streaming error handler must return HTMLElement, got {type(response)}"
+                )
+
+            async for chunk in iter_html(response, chunk_size):
+                yield chunk
+
+    async def exception_handler(request: Request, exception: HTTPException):
+        return StreamingResponse(
+            body(request, exception),
+            status_code=exception.status_code,
+            media_type="text/html",
+        )
+
     return exception_handler
@@ -0,0 +1,116 @@
+import hashlib
+import inspect
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import Response, StreamingResponse
+
+from likulau._internal.executor import Executor
+from likulau._internal.fragments import FRAGMENT_HEADER
+from likulau._internal.utils import to_async
+
+# Headers a 304 must repeat from the response it stands in for
+NOT_MODIFIED_HEADERS = ("cache-control", "content-location", "date", "etag", "expires", "vary")
+
+
+def _digest(content: bytes):
+    return hashlib.md5(content, usedforsecurity=False).hexdigest()
+
+
+def body_etag(body: bytes):
+    # Weak, so it stays valid when the body is compressed on the way out
+    return f'W/"{_digest(body)}"'
+
+
+def version_salt(func: Callable[..., Any]):
+    """Changes whenever the module defining func is edited, so a new deploy does not
+    answer 304 for pages whose version is the same but whose markup changed.
+
+    Taken from the source rather than its mtime, so every host serving the same
+    deploy agrees on it.
+    """
+    try:
+        with open(inspect.getfile(func), "rb") as source:
+            content = source.read()
+    except (OSError, TypeError):
+        return func.__module__
+    return f"{func.__module__}:{_digest(content)}"
+
+
+def version_etag(salt: str, version: Any):
+    return f'W/"v-{_digest(f"{salt}:{version}".encode())}"'
+
+
+def compile_version(func: Callable[..., Any], executor: Executor | None = None):
+    """Turns a page's get_version() into a function giving the ETag for some props."""
+    version = to_async(func, executor)
+    takes_props = len(inspect.signature(func).parameters) == 1
+    salt = version_salt(func)
+
+    async def inner(props: Any, fragment: str | None = None):
+        key = await version(props) if takes_props else await version()
+        # Fragments of a page are different representations of it
+        if fragment is not None:
+            key = f"{key}#{fragment}"
+        return version_etag(salt, key)
+
+    return inner
+
+
+def etag_matches(request: Request, etag: str):
+    if request.method not in ("GET", "HEAD"):
+        return False
+
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+
+    if if_none_match.strip() == "*":
+        return True
+
+    # If-None-Match uses weak comparison, so W/ prefixes are ignored
+    tag = etag.removeprefix("W/")
+    return any(
+        candidate.strip().removeprefix("W/") == tag
+        for candidate in if_none_match.split(",")
+    )
+
+
+def not_modified(headers: dict[str, str] | Any, background: BackgroundTask | None = None):
+    return Response(
+        status_code=304,
+        headers={
+            name: value for name, value in headers.items() if name.lower() in NOT_MODIFIED_HEADERS
+        },
+        background=background,
+    )
+
+
+def with_etag(handler: Callable[[Request], Awaitable[Response]]):
+    """Adds an ETag to rendered pages, answering If-None-Match with 304 Not Modified."""
+
+    async def inner(request: Request):
+        response = await handler(request)
+        if response.status_code != 200 or request.method not in ("GET", "HEAD"):
+            return response
+
+        etag = response.headers.get("etag")
+        if not etag:
+            # Streamed and file responses have no body to hash up front
+            body = getattr(response, "body", None)
+            if body is None or isinstance(response, StreamingResponse):
+                return response
+
+            etag = body_etag(body)
+            response.headers["etag"] = etag
+
+        # Fragments are served from the same URL, tell caches apart
+        response.headers.add_vary_header(FRAGMENT_HEADER)
+        if etag_matches(request, etag):
+            # Keep background work, such as revalidating a stale page, going
+            return not_modified(response.headers, response.background)
+        return response
+
+    return inner
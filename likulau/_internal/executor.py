@@ -0,0 +1,97 @@
+import math
+import time
+from dataclasses import dataclass
+from functools import partial
+from typing import Any, Callable
+
+import anyio
+import anyio.to_thread
+
+from likulau._internal import metrics
+from likulau.env import env
+
+
+@dataclass(frozen=True)
+class ExecutorStats:
+    size: int
+    waiting: int
+    running: int
+    completed: int
+    wait_time_total: float
+    wait_time_max: float
+
+
+class Executor:
+    """Runs sync functions in worker threads, bounded by its own pool size.
+
+    Threads are still spawned by AnyIO, but the amount of concurrently running calls
+    is gated here instead of by AnyIO's process-wide limiter, so a busy executor does
+    not starve the others.
+    """
+
+    def __init__(self, name: str, size: int):
+        self.name = name
+        self.size = size
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_time_total = 0.0
+        self.wait_time_max = 0.0
+        self._limiter: anyio.CapacityLimiter | None = None
+        executors[name] = self
+
+    def _get_limiter(self):
+        # Limiters can only be created inside an event loop
+        if not self._limiter:
+            self._limiter = anyio.CapacityLimiter(self.size)
+        return self._limiter
+
+    def stats(self):
+        return ExecutorStats(
+            self.size,
+            self.waiting,
+            self.running,
+            self.completed,
+            self.wait_time_total,
+            self.wait_time_max,
+        )
+
+    async def run(self, func: Callable[..., Any], *args, **kwargs):
+        limiter = self._get_limiter()
+
+        start = time.perf_counter()
+        self.waiting += 1
+        try:
+            await limiter.acquire()
+        finally:
+            self.waiting -= 1
+
+        wait_time = time.perf_counter() - start
+        self.wait_time_total += wait_time
+        self.wait_time_max = max(self.wait_time_max, wait_time)
+        if metrics.enabled:
+            metrics.observe_wait(self.name, wait_time)
+
+        self.running += 1
+        try:
+            return await anyio.to_thread.run_sync(
+                partial(func, *args, **kwargs), limiter=_get_unbounded_limiter()
+            )
+        finally:
+            self.running -= 1
+            self.completed += 1
+            limiter.release()
+
+
+executors: dict[str, Executor] = {}
+_unbounded_limiter: anyio.CapacityLimiter | None = None
+
+
+def _get_unbounded_limiter():
+    global _unbounded_limiter
+    if not _unbounded_limiter:
+        _unbounded_limiter = anyio.CapacityLimiter(math.inf)
+    return _unbounded_limiter
+
+
+default_executor = Executor("default", env("THREAD_POOL_SIZE", cast=int, default=40))
@@ -1,40 +1,204 @@
+import importlib
+import inspect
+import typing
 from hashlib import md5
+from types import ModuleType
+from typing import Any
+
 from liku import HTMLElement
+from starlette.datastructures import FormData
 from starlette.requests import Request
-from starlette.responses import HTMLResponse
+from starlette.exceptions import HTTPException
+from starlette.responses import HTMLResponse, PlainTextResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from likulau._internal import metrics
+from likulau._internal.multipart import (
+    FormError,
+    FormLimits,
+    FormStream,
+    iter_form_events,
+    read_form,
+)
+from likulau._internal.fragments import FRAGMENT_HEADER, requested_fragment, select_fragment
+from likulau.fragments import NamedFragment
 from likulau._internal.utils import run_async
 from likulau.types import RPCFunction
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 
 RPC_IDENT = "liku-rpc"
+RPC_IDENT_BYTES = RPC_IDENT.encode()
 RPC_MAPPING: dict[str, RPCFunction] = {}
+# Handlers listed in the route manifest, as module:qualname, imported on their first call
+RPC_SOURCES: dict[str, str] = {}
 
 
 def get_rpc_ident(func: RPCFunction):
-    ident = md5(func.__qualname__.encode()).hexdigest()
+    """Ident of a form handler, the same in every process as long as the handler keeps
+    its module and name."""
+    ident = getattr(func, "_rpc_ident", None)
+    if ident is None:
+        ident = md5(f"{func.__module__}.{func.__qualname__}".encode()).hexdigest()
+        try:
+            func._rpc_ident = ident  # type: ignore
+        except AttributeError:
+            # Bound methods, computed every time
+            pass
+
     if ident not in RPC_MAPPING:
         RPC_MAPPING[ident] = func
-
     return ident
 
 
 def get_rpc_endpoint(func: RPCFunction):
-    ident = get_rpc_ident(func)
-    return f"?{RPC_IDENT}={ident}"
+    endpoint = getattr(func, "_rpc_endpoint", None)
+    if endpoint is None:
+        endpoint = f"?{RPC_IDENT}={get_rpc_ident(func)}"
+        try:
+            func._rpc_endpoint = endpoint  # type: ignore
+        except AttributeError:
+            pass
+    return endpoint
+
+
+def _is_rpc(obj: Any):
+    if not inspect.isfunction(obj):
+        return False
+    if any(hasattr(obj, attr) for attr in ("_rpc", "_form_limits", "_streaming_form")):
+        return True
+
+    try:
+        types = typing.get_type_hints(obj)
+    except Exception:
+        return False
+    parameters = list(inspect.signature(obj).parameters)
+    return len(parameters) == 1 and types.get(parameters[0]) in (FormData, FormStream)
+
+
+def _check_rpc(func: Any):
+    name = f"{func.__module__}.{func.__qualname__}"
+    if len(inspect.signature(func).parameters) != 1:
+        raise Exception(f"Form handler {name} must take the form as its only argument")
+    if getattr(func, "_streaming_form", False) and not inspect.iscoroutinefunction(func):
+        raise Exception(f"Form handler {name} reads a streamed form, so it must be an async function")
+
+
+def register_module_rpcs(module: ModuleType, validate: bool = True):
+    """Registers the form handlers of a page or error module ahead of any render.
+
+    Form handlers are functions decorated with rpc(), form_limits() or streaming_form(),
+    or taking a single parameter annotated as FormData or FormStream. Modules loaded
+    without validation take their handlers from the route manifest when it has them,
+    instead of reading the annotations of every function.
+    """
+    if not validate and RPC_SOURCES:
+        prefix = f"{module.__name__}:"
+        for ident, source in RPC_SOURCES.items():
+            if source.startswith(prefix):
+                _load_rpc(ident)
+        return
+
+    for obj in list(vars(module).values()):
+        if not _is_rpc(obj):
+            continue
+
+        _check_rpc(obj)
+        ident = get_rpc_ident(obj)
+        # A module imported again, for example by the dev server, replaces its handlers
+        RPC_MAPPING[ident] = obj
 
 
-class FormRPCMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint):
+def registered_rpcs():
+    """Registered form handlers by ident, as module:qualname, leaving out those that
+    cannot be imported, such as functions defined inside other functions."""
+    return {
+        ident: f"{func.__module__}:{func.__qualname__}"
+        for ident, func in RPC_MAPPING.items()
+        if "<locals>" not in func.__qualname__
+    }
+
+
+def _load_rpc(ident: str):
+    source = RPC_SOURCES.get(ident)
+    if not source:
+        return None
+
+    module, _, qualname = source.partition(":")
+    func: Any = importlib.import_module(module)
+    for name in qualname.split("."):
+        func = getattr(func, name)
+
+    _check_rpc(func)
+    RPC_MAPPING[ident] = func
+    return func
+
+
+class FormRPCMiddleware:
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        # Most requests are not RPC calls, only parse the query string of the ones
+        # that could be.
+        if scope["type"] != "http" or RPC_IDENT_BYTES not in scope["query_string"]:
+            return await self.app(scope, receive, send)
+
+        request = Request(scope, receive)
         rpc_ident = request.query_params.get(RPC_IDENT)
         if not rpc_ident:
-            return await call_next(request)
+            return await self.app(scope, receive, send)
 
-        rpc_func = RPC_MAPPING.get(rpc_ident)
+        rpc_func = RPC_MAPPING.get(rpc_ident) or _load_rpc(rpc_ident)
         if not rpc_func:
-            return await call_next(request)
+            response = PlainTextResponse("Unknown form handler", 404)
+            return await response(scope, receive, send)
+
+        handler = _call_rpc
+        if metrics.enabled:
+            route = f"rpc:{rpc_func.__module__}.{rpc_func.__qualname__}"
+            handler = metrics.labelled(route, metrics.timed(route, "rpc_handler", _call_rpc))
+
+        fragment = requested_fragment(request)
+        limits: FormLimits | None = getattr(rpc_func, "_form_limits", None)
+        if getattr(rpc_func, "_streaming_form", False):
+            # The function reads the body itself, so limits are enforced while it runs
+            events = iter_form_events(request, limits or FormLimits())
+            try:
+                response = await handler(rpc_func, FormStream(events), fragment)
+            except FormError as e:
+                response = PlainTextResponse(e.detail, e.status_code)
+            finally:
+                await events.aclose()
+            await response(scope, receive, send)
+        elif limits:
+            try:
+                form = await read_form(request, limits)
+            except FormError as e:
+                response = PlainTextResponse(e.detail, e.status_code)
+                return await response(scope, receive, send)
+
+            try:
+                response = await handler(rpc_func, form, fragment)
+                await response(scope, receive, send)
+            finally:
+                await form.close()
+        else:
+            async with request.form() as form:
+                response = await handler(rpc_func, form, fragment)
+                await response(scope, receive, send)
+
+
+async def _call_rpc(rpc_func: RPCFunction, form: FormData | FormStream, fragment: str | None):
+    response = await run_async(rpc_func, form)
+    if isinstance(response, HTMLElement):
+        if fragment:
+            try:
+                response = select_fragment(response, fragment)
+            except HTTPException as e:
+                # Raised outside of the router, so no exception handler would see it
+                return PlainTextResponse(e.detail, e.status_code)
 
-        async with request.form() as form:
-            response = await run_async(rpc_func, form)
-            if isinstance(response, HTMLElement):
-                response = HTMLResponse(str(response))
-            return response
+        headers = None
+        if isinstance(response, NamedFragment):
+            # Tells the client which part of the page this replaces
+            headers = {FRAGMENT_HEADER: response.name}
+        response = HTMLResponse(str(response), headers=headers)
+    return response
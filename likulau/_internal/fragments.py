@@ -0,0 +1,50 @@
+from typing import Any
+
+import liku
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+from likulau.fragments import NamedFragment
+
+FRAGMENT_HEADER = "x-likulau-fragment"
+FRAGMENT_QUERY = "liku-fragment"
+
+
+def requested_fragment(request: Request):
+    """The fragment a request asks for.
+
+    None renders the whole page, an empty string only the page without its layout,
+    and anything else the fragment with that name.
+    """
+    name = request.headers.get(FRAGMENT_HEADER)
+    if name is None:
+        name = request.query_params.get(FRAGMENT_QUERY)
+    return name
+
+
+def find_fragment(node: Any, name: str) -> NamedFragment | None:
+    if isinstance(node, NamedFragment) and node.name == name:
+        return node
+
+    if isinstance(node, list):
+        children = node
+    elif isinstance(node, liku.HTMLElement):
+        children = node.children
+    else:
+        return None
+
+    for child in children:
+        found = find_fragment(child, name)
+        if found:
+            return found
+    return None
+
+
+def select_fragment(node: liku.HTMLElement, name: str):
+    if not name:
+        return node
+
+    found = find_fragment(node, name)
+    if not found:
+        raise HTTPException(404, f"No fragment named {name}")
+    return found
@@ -0,0 +1,231 @@
+import importlib
+import logging
+import os
+import signal
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import anyio
+import anyio.to_thread
+from starlette.applications import Starlette
+from starlette.routing import BaseRoute
+from uvicorn.supervisors.basereload import BaseReload
+
+from likulau._internal import process_pool, providers
+from likulau._internal.cache import CacheBackend
+from likulau._internal.errors import _load_error_handler
+from likulau._internal.imports import ImportGraph, module_name, snapshot
+from likulau._internal.isr import RenderCache
+from likulau._internal.router import SegmentRouter
+from likulau._internal.routes import LikulauRoute, _page_path, _process_page_module, _sort_route
+
+logger = logging.getLogger("likulau.hot_reload")
+
+POLL_INTERVAL = 0.5
+
+
+def _changed(old: dict[Path, int], new: dict[Path, int]):
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+
+def _provider_graph():
+    return {
+        (ctx.context.name, provider.scope, tuple(dep.context.name for dep in provider.dependencies))
+        for ctx, provider in providers.app_providers.items()
+    }
+
+
+class RestartRequired(Exception):
+    pass
+
+
+class HotReloader:
+    """Applies changes to src to a running app, re-importing changed modules along with
+    the modules importing them, and replacing the routes and error handlers they back.
+
+    Changes to src/app.py, to app scoped providers, or to which providers exist and
+    what they depend on, cannot be applied in place and require a restart.
+    """
+
+    def __init__(
+        self,
+        app: Starlette,
+        render_cache: RenderCache | None = None,
+        cache_backend: CacheBackend | None = None,
+    ):
+        self.app = app
+        self.render_cache = render_cache
+        self.cache_backend = cache_backend
+        self.graph = ImportGraph()
+        self.mtimes = snapshot()
+        self.graph.dependents(self.mtimes)
+
+    async def watch(self):
+        while True:
+            await anyio.sleep(POLL_INTERVAL)
+            mtimes = await anyio.to_thread.run_sync(snapshot)
+            changed = _changed(self.mtimes, mtimes)
+            if not changed:
+                continue
+
+            # Files created or deleted, rather than edited
+            moved = self.mtimes.keys() ^ mtimes.keys()
+            self.mtimes = mtimes
+            try:
+                self.apply(changed, moved)
+            except RestartRequired as e:
+                logger.warning(f"{e}, restarting")
+                # The reloader process starts a new server once this one stops
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+
+    def apply(self, changed: set[Path], moved: set[Path]):
+        if any(path.is_relative_to("src/providers") for path in moved):
+            raise RestartRequired("A provider was added or removed")
+
+        modules = self.graph.affected({module_name(path) for path in changed}, self.mtimes)
+        if "src.app" in modules:
+            raise RestartRequired("src/app.py changed")
+
+        provider_modules = [module for module in modules if module.startswith("src.providers.")]
+        for provider in providers.app_providers.values():
+            if provider.scope == "app" and provider.provider.__module__ in modules:
+                raise RestartRequired(f"App scoped provider {provider.provider.__qualname__} changed")
+
+        logger.info(f"Reloading {', '.join(modules)}")
+        for module in modules:
+            sys.modules.pop(module, None)
+
+        failed: set[str] = set()
+        for module in modules:
+            if not self._source(module).exists():
+                continue
+            try:
+                importlib.import_module(module)
+            except Exception:
+                logger.exception(f"Failed to reload {module}")
+                failed.add(module)
+
+        if provider_modules:
+            graph = _provider_graph()
+            try:
+                providers.setup_providers()
+            except Exception as e:
+                raise RestartRequired(f"Providers could not be set up again ({e})")
+            if _provider_graph() != graph:
+                raise RestartRequired("Providers or their dependencies changed")
+
+        for module in modules:
+            if module in failed:
+                continue
+            try:
+                if module.startswith("src.pages."):
+                    self._reload_page(module)
+                elif module.startswith("src.errors."):
+                    self._reload_error_handler(module)
+            except Exception:
+                logger.exception(f"Failed to reload {module}")
+
+        if any(module in process_pool.modules for module in modules):
+            # Workers still hold the previous version, new ones import the current one
+            process_pool.shutdown()
+
+    def _source(self, module: str):
+        path = Path(*module.split("."))
+        return path.with_suffix(".py") if not path.is_dir() else path / "__init__.py"
+
+    def _reload_page(self, module: str):
+        path = _page_path(self._source(module).with_suffix(""))
+        routes = self.app.router.routes
+        index = next(
+            (
+                index
+                for index, route in enumerate(routes)
+                if hasattr(route, "_likulau_route_info") and getattr(route, "path", None) == path
+            ),
+            None,
+        )
+
+        if module not in sys.modules:
+            if index is not None:
+                del routes[index]
+                logger.info(f"Removed {path}")
+        else:
+            route_info = LikulauRoute(path, *_process_page_module(sys.modules[module]))
+            route = route_info.create_router_func(self.render_cache, self.cache_backend)
+            if index is not None:
+                routes[index] = route
+            else:
+                routes.insert(self._insert_position(routes, route_info), route)
+            logger.info(f"Reloaded {path}")
+
+        if isinstance(self.app.router, SegmentRouter):
+            self.app.router.invalidate()
+
+    def _insert_position(self, routes: list[BaseRoute], route_info: LikulauRoute):
+        # Among the other pages, in the order discover_pages() sorts them in
+        key = _sort_route(route_info)
+        last = 0
+        for index, route in enumerate(routes):
+            if not hasattr(route, "_likulau_route_info"):
+                continue
+            if _sort_route(route) > key:  # type: ignore
+                return index
+            last = index + 1
+        return last
+
+    def _reload_error_handler(self, module: str):
+        code = int(module.rpartition(".")[2])
+        if module in sys.modules:
+            self.app.exception_handlers[code] = _load_error_handler(sys.modules[module])
+        else:
+            self.app.exception_handlers.pop(code, None)
+        # Exception handlers are copied into the middleware stack when it is built
+        self.app.middleware_stack = None
+        logger.info(f"Reloaded error handler {code}")
+
+
+def with_hot_reload(
+    lifespan,
+    render_cache: RenderCache | None = None,
+    cache_backend: CacheBackend | None = None,
+):
+    """Wraps a Starlette lifespan to apply changes to src while the app runs."""
+
+    @asynccontextmanager
+    async def inner(app):
+        reloader = HotReloader(app, render_cache, cache_backend)
+        async with anyio.create_task_group() as tg:
+            tg.start_soon(reloader.watch)
+            async with lifespan(app) as state:
+                yield state
+            tg.cancel_scope.cancel()
+
+    return inner
+
+
+class HotReload(BaseReload):
+    """Restarts the server once it stopped after a change it could not apply in place.
+
+    Every other change is applied by the server itself, see HotReloader.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.reloader_name = "likulau hot reload"
+        self.mtimes = snapshot()
+        self.pending: set[Path] = set()
+
+    def should_restart(self):
+        self.pause()
+        mtimes = snapshot()
+        self.pending |= _changed(self.mtimes, mtimes)
+        self.mtimes = mtimes
+
+        # A server failing to start is only restarted after the next change
+        if self.pending and not self.process.is_alive():
+            changes = sorted(self.pending)
+            self.pending = set()
+            return changes
+        return None
@@ -0,0 +1,120 @@
+import ast
+from pathlib import Path
+
+SOURCE_DIRECTORY = "src"
+
+
+def snapshot():
+    mtimes: dict[Path, int] = {}
+    for path in Path(SOURCE_DIRECTORY).glob("**/*.py"):
+        try:
+            mtimes[path] = path.stat().st_mtime_ns
+        except OSError:
+            continue
+    return mtimes
+
+
+def module_name(path: Path):
+    path = path.with_suffix("")
+    if path.name == "__init__":
+        path = path.parent
+    return ".".join(path.parts)
+
+
+def parse_imports(path: Path, module: str):
+    """Names of the modules imported by the module at path, as written in its source."""
+    tree = ast.parse(path.read_bytes(), str(path))
+    package = module if path.stem == "__init__" else module.rpartition(".")[0]
+
+    names: set[str] = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.update(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            base = node.module or ""
+            if node.level:
+                parent = package.rsplit(".", node.level - 1)[0] if node.level > 1 else package
+                base = f"{parent}.{base}" if base else parent
+            names.add(base)
+            # from src.components import nav may import a module as well
+            names.update(f"{base}.{alias.name}" for alias in node.names)
+    return names
+
+
+class ImportGraph:
+    """Which modules of src import which, parsed from their sources."""
+
+    def __init__(self):
+        self.parsed: dict[Path, tuple[int, set[str]]] = {}
+
+    def imports(self, mtimes: dict[Path, int]):
+        """Modules of src imported by each module of src."""
+        modules = {module_name(path): path for path in mtimes}
+        imports: dict[str, set[str]] = {}
+        for module, path in modules.items():
+            cached = self.parsed.get(path)
+            if not cached or cached[0] != mtimes[path]:
+                try:
+                    cached = (mtimes[path], parse_imports(path, module))
+                except (OSError, SyntaxError):
+                    # Reported when the module is imported
+                    cached = (mtimes[path], set())
+                self.parsed[path] = cached
+
+            imports[module] = {
+                imported for imported in cached[1] if imported in modules and imported != module
+            }
+        return imports
+
+    def dependents(self, mtimes: dict[Path, int]):
+        dependents: dict[str, set[str]] = {}
+        for module, imported in self.imports(mtimes).items():
+            for name in imported:
+                dependents.setdefault(name, set()).add(module)
+        return dependents
+
+    def dependencies(self, modules: set[str], mtimes: dict[Path, int]):
+        """The given modules and every module of src they import, directly or not."""
+        imports = self.imports(mtimes)
+        found: set[str] = set()
+        queue = list(modules)
+        while queue:
+            module = queue.pop()
+            if module in found:
+                continue
+            found.add(module)
+            queue += imports.get(module, ())
+            # Importing a module runs the __init__ of its packages first
+            parent = module.rpartition(".")[0]
+            if parent in imports:
+                queue.append(parent)
+        return found
+
+    def affected(self, changed: set[str], mtimes: dict[Path, int]):
+        """Changed modules and everything depending on them, in the order to import them in."""
+        dependents = self.dependents(mtimes)
+        affected: set[str] = set()
+        queue = list(changed)
+        while queue:
+            module = queue.pop()
+            if module not in affected:
+                affected.add(module)
+                queue += dependents.get(module, ())
+
+        # Depth first, so a module is only imported after what it imports
+        order: list[str] = []
+        visiting: set[str] = set()
+
+        def visit(module: str):
+            if module in order or module in visiting:
+                return
+            visiting.add(module)
+            for dependent in dependents.get(module, ()):
+                visit(dependent)
+            visiting.discard(module)
+            order.append(module)
+
+        for module in sorted(affected):
+            visit(module)
+        order.reverse()
+        return order
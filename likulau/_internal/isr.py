@@ -0,0 +1,133 @@
+import logging
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Awaitable, Callable
+
+import anyio
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, Response, StreamingResponse
+
+from likulau._internal.cache import CACHE_HEADER
+from likulau._internal.fragments import requested_fragment
+from likulau._internal.utils import output_file, run_async
+
+if TYPE_CHECKING:
+    from likulau._internal.routes import LikulauRoute
+
+logger = logging.getLogger("likulau.isr")
+
+
+@dataclass
+class CachedPage:
+    body: bytes
+    rendered_at: float
+    revalidating: bool = False
+
+
+class RenderCache:
+    """Rendered pages by path, seeded from a previous build when available."""
+
+    def __init__(self, seed_directory: Path | None = None):
+        self.pages: dict[str, CachedPage] = {}
+        self.seed_directory = seed_directory.resolve() if seed_directory else None
+
+    def _seed(self, path: str):
+        if not self.seed_directory:
+            return None
+
+        try:
+            seed_file = output_file(self.seed_directory, path)
+        except ValueError:
+            return None
+
+        if not seed_file.is_file():
+            return None
+
+        return CachedPage(seed_file.read_bytes(), seed_file.stat().st_mtime)
+
+    def get(self, path: str):
+        page = self.pages.get(path)
+        if not page:
+            page = self._seed(path)
+            if page:
+                self.pages[path] = page
+
+        return page
+
+    def set(self, path: str, body: bytes):
+        self.pages[path] = CachedPage(body, time.time())
+
+
+def _is_cacheable(response: Response):
+    return response.status_code == 200 and not isinstance(response, StreamingResponse)
+
+
+def _params_key(params: dict[str, Any]):
+    # Path parameters are converted, static paths may give them either way
+    return tuple(sorted((name, str(value)) for name, value in params.items()))
+
+
+def with_render_cache(
+    route: "LikulauRoute",
+    handler: Callable[[Request], Awaitable[Response]],
+    cache: RenderCache,
+):
+    async def revalidate(request: Request, page: CachedPage):
+        try:
+            response = await handler(request)
+            if _is_cacheable(response):
+                cache.set(request.url.path, response.body)
+        except Exception:
+            logger.exception(f"Failed to revalidate {request.url.path}, keeping stale page")
+        finally:
+            page.revalidating = False
+
+    static_paths: set[tuple[tuple[str, str], ...]] | None = None
+    lock = anyio.Lock()
+
+    async def is_static(request: Request):
+        nonlocal static_paths
+        if static_paths is None:
+            async with lock:
+                if static_paths is None:
+                    params = await run_async(route.static_paths_func)  # type: ignore
+                    static_paths = {_params_key(path_params) for path_params in params}
+        return _params_key(request.path_params) in static_paths
+
+    async def inner(request: Request):
+        # Only whole pages at the paths of get_static_paths() are cached, anything else
+        # is rendered as usual so arbitrary URLs cannot grow the cache
+        if (
+            request.method not in ("GET", "HEAD")
+            or requested_fragment(request) is not None
+            or not await is_static(request)
+        ):
+            return await handler(request)
+
+        path = request.url.path
+        page = cache.get(path)
+        if not page:
+            response = await handler(request)
+            if _is_cacheable(response):
+                cache.set(path, response.body)
+            response.headers[CACHE_HEADER] = "MISS"
+            return response
+
+        is_stale = (
+            route.revalidate is not None
+            and time.time() - page.rendered_at >= route.revalidate
+        )
+        if not is_stale or page.revalidating:
+            return HTMLResponse(page.body, headers={CACHE_HEADER: "HIT"})
+
+        # Serve the stale page right away, rendering the new one after it has been sent
+        page.revalidating = True
+        return HTMLResponse(
+            page.body,
+            headers={CACHE_HEADER: "STALE"},
+            background=BackgroundTask(revalidate, request, page),
+        )
+
+    return inner
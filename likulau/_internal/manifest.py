@@ -0,0 +1,104 @@
+import importlib
+import json
+import logging
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Callable
+
+import anyio
+import anyio.to_thread
+
+from likulau._internal import providers
+from likulau._internal.errors import discover_error_handlers
+from likulau._internal.form_rpc import registered_rpcs
+from likulau._internal.routes import discover_pages
+from likulau._internal.utils import iter_modules
+
+logger = logging.getLogger("likulau.manifest")
+
+ROUTE_MANIFEST_FILE = ".likulau-routes.json"
+ROUTE_MANIFEST_VERSION = 3
+SOURCE_DIRECTORIES = ("src/pages", "src/errors", "src/providers")
+
+
+def _source_files():
+    files: dict[str, list[int]] = {}
+    for directory in SOURCE_DIRECTORIES:
+        for path in sorted(Path(directory).glob("**/*.py")):
+            stat = path.stat()
+            files[path.as_posix()] = [stat.st_mtime_ns, stat.st_size]
+    return files
+
+
+def compile_route_manifest():
+    """Discovers and validates every page, error handler and provider, then writes
+    the result so later startups can skip doing so."""
+    providers.setup_providers()
+    routes = discover_pages()
+    discover_error_handlers()
+
+    manifest = {
+        "version": ROUTE_MANIFEST_VERSION,
+        "files": _source_files(),
+        "providers": [module for _, module in iter_modules("src/providers")],
+        "pages": [
+            {
+                "path": route.path,
+                "module": route.page_func.__module__,
+                "methods": route.methods,
+                # Render workers import these as they start, before the page is loaded
+                "process_pool": getattr(route.page_func, "_process_pool", False),
+            }
+            for route in routes
+        ],
+        "errors": {page.stem: module for page, module in iter_modules("src/errors")},
+        # Lets any worker call any form handler, before its page is loaded
+        "rpc": registered_rpcs(),
+    }
+    Path(ROUTE_MANIFEST_FILE).write_text(json.dumps(manifest, indent=2))
+    return manifest
+
+
+def load_route_manifest() -> dict[str, Any] | None:
+    """Loads the route manifest, unless it is missing or any source file changed since."""
+    manifest_file = Path(ROUTE_MANIFEST_FILE)
+    if not manifest_file.exists():
+        return None
+
+    manifest = json.loads(manifest_file.read_text())
+    if manifest.get("version") != ROUTE_MANIFEST_VERSION:
+        return None
+
+    if manifest["files"] != _source_files():
+        logger.warning("Route manifest is outdated, run `likulau compile` to update it")
+        return None
+
+    return manifest
+
+
+def with_warmup(lifespan, modules: list[str], loaders: list[Callable[[], None]]):
+    """Wraps a Starlette lifespan to load lazy routes in the background once started."""
+
+    async def warmup():
+        # Importing is the slow part, do it off the event loop
+        for module in modules:
+            try:
+                await anyio.to_thread.run_sync(importlib.import_module, module)
+            except Exception:
+                logger.exception(f"Failed to load {module}")
+
+        for load in loaders:
+            try:
+                load()
+            except Exception:
+                logger.exception("Failed to load route")
+        logger.info("Finished loading all pages")
+
+    @asynccontextmanager
+    async def inner(app):
+        async with anyio.create_task_group() as tg, lifespan(app) as state:
+            tg.start_soon(warmup)
+            yield state
+            tg.cancel_scope.cancel()
+
+    return inner
@@ -0,0 +1,256 @@
+import time
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, AsyncContextManager
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+BYTES_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+UNMATCHED_ROUTE = "unmatched"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Checked once when routes are compiled, so disabled instrumentation costs nothing per request
+enabled = False
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+class Histogram:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class HistogramFamily:
+    """Histograms sharing a name, one for every combination of label values."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        label_names: tuple[str, ...],
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.buckets = buckets
+        self.children: dict[tuple[str, ...], Histogram] = {}
+
+    def labels(self, *values: str):
+        histogram = self.children.get(values)
+        if not histogram:
+            histogram = self.children[values] = Histogram(self.buckets)
+        return histogram
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} histogram"]
+        for values, histogram in sorted(self.children.items()):
+            labels = _format_labels(self.label_names, values)
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), histogram.counts):
+                cumulative += count
+                bucket_labels = _format_labels((*self.label_names, "le"), (*values, str(bound)))
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{labels} {histogram.sum}")
+            lines.append(f"{self.name}_count{labels} {histogram.count}")
+        return lines
+
+
+class CounterFamily:
+    def __init__(self, name: str, description: str, label_names: tuple[str, ...]):
+        self.name = name
+        self.description = description
+        self.label_names = label_names
+        self.children: dict[tuple[str, ...], int] = {}
+
+    def inc(self, *values: str):
+        self.children[values] = self.children.get(values, 0) + 1
+
+    def expose(self):
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} counter"]
+        for values, count in sorted(self.children.items()):
+            lines.append(f"{self.name}{_format_labels(self.label_names, values)} {count}")
+        return lines
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...]):
+    escaped = (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for value in values
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+request_duration = HistogramFamily(
+    "likulau_request_duration_seconds", "Time taken to respond to a request.", ("route",)
+)
+phase_duration = HistogramFamily(
+    "likulau_phase_duration_seconds", "Time spent in each phase of a request.", ("route", "phase")
+)
+response_bytes = HistogramFamily(
+    "likulau_response_bytes", "Size of response bodies.", ("route",), BYTES_BUCKETS
+)
+thread_pool_wait = HistogramFamily(
+    "likulau_thread_pool_wait_seconds",
+    "Time sync functions waited for a free thread.",
+    ("executor",),
+)
+errors = CounterFamily(
+    "likulau_errors_total", "Requests that failed with a server error.", ("route",)
+)
+
+
+@dataclass
+class RequestMetrics:
+    route: str | None = None
+    timings: list[tuple[str, float]] = field(default_factory=list)
+
+
+current: ContextVar[RequestMetrics | None] = ContextVar("likulau_request_metrics", default=None)
+
+
+def observe_phase(route: str, phase: str, duration: float):
+    phase_duration.labels(route, phase).observe(duration)
+    metrics = current.get()
+    if metrics:
+        metrics.timings.append((phase, duration))
+
+
+def observe_wait(executor: str, duration: float):
+    thread_pool_wait.labels(executor).observe(duration)
+    metrics = current.get()
+    if metrics and metrics.route:
+        observe_phase(metrics.route, "thread_wait", duration)
+
+
+def timed[**P, T](route: str, phase: str, func: Callable[P, Awaitable[T]]) -> Callable[P, Awaitable[T]]:
+    async def inner(*args: P.args, **kwargs: P.kwargs):
+        start = time.perf_counter()
+        try:
+            return await func(*args, **kwargs)
+        finally:
+            observe_phase(route, phase, time.perf_counter() - start)
+
+    return inner
+
+
+def labelled(route: str, handler: Callable[[Request], Awaitable[Any]]):
+    """Attributes the requests handled by handler to route."""
+
+    async def inner(request: Request):
+        metrics = current.get()
+        if metrics:
+            metrics.route = route
+        return await handler(request)
+
+    return inner
+
+
+def timed_sync[**P, T](route: str, phase: str, func: Callable[P, T]) -> Callable[P, T]:
+    def inner(*args: P.args, **kwargs: P.kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            observe_phase(route, phase, time.perf_counter() - start)
+
+    return inner
+
+
+def timed_context(route: str, phase: str, func: Callable[[], AsyncContextManager[Any]]):
+    """Wraps a context manager factory, recording entering and exiting as separate phases."""
+
+    @asynccontextmanager
+    async def inner():
+        start = time.perf_counter()
+        async with func() as value:
+            observe_phase(route, f"{phase}_enter", time.perf_counter() - start)
+            try:
+                yield value
+            finally:
+                start = time.perf_counter()
+        observe_phase(route, f"{phase}_exit", time.perf_counter() - start)
+
+    return inner
+
+
+def server_timing(timings: list[tuple[str, float]]):
+    totals: dict[str, float] = {}
+    for phase, duration in timings:
+        totals[phase] = totals.get(phase, 0.0) + duration
+    return ", ".join(f"{phase};dur={duration * 1000:.3f}" for phase, duration in totals.items())
+
+
+class MetricsMiddleware:
+    """Records the duration, response size and errors of every request.
+
+    With server_timing, the phases that finished before the response started are
+    sent in a Server-Timing header.
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = False):
+        self.app = app
+        self.server_timing = server_timing
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        metrics = RequestMetrics()
+        token = current.set(metrics)
+        start = time.perf_counter()
+        status = 500
+        size = 0
+        failed = False
+
+        async def wrapped_send(message: Message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                if self.server_timing and metrics.timings:
+                    headers = MutableHeaders(scope=message)
+                    headers.append("server-timing", server_timing(metrics.timings))
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, wrapped_send)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            current.reset(token)
+            route = metrics.route or UNMATCHED_ROUTE
+            request_duration.labels(route).observe(time.perf_counter() - start)
+            response_bytes.labels(route).observe(size)
+            if failed or status >= 500:
+                errors.inc(route)
+
+
+def metrics_text():
+    lines: list[str] = []
+    for family in (request_duration, phase_duration, response_bytes, thread_pool_wait, errors):
+        lines += family.expose()
+    return "\n".join(lines) + "\n"
+
+
+async def metrics_endpoint(request: Request):
+    return PlainTextResponse(metrics_text(), media_type=CONTENT_TYPE)
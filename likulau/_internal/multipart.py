@@ -0,0 +1,316 @@
+from dataclasses import dataclass
+from tempfile import SpooledTemporaryFile
+from typing import Any, AsyncGenerator
+from urllib.parse import unquote_plus
+
+from starlette.datastructures import FormData, Headers, UploadFile
+from starlette.exceptions import HTTPException
+from starlette.requests import Request
+
+# Same as Starlette, python-multipart is only importable under this name from 0.0.13
+try:
+    import python_multipart as multipart
+    from python_multipart.exceptions import FormParserError
+    from python_multipart.multipart import parse_options_header
+except ModuleNotFoundError:  # pragma: nocover
+    import multipart
+    from multipart.exceptions import FormParserError
+    from multipart.multipart import parse_options_header
+
+# Same as Starlette, files larger than this are moved from memory to disk
+DEFAULT_SPOOL_SIZE = 1024 * 1024
+
+type FormEvent = tuple[Any, ...]
+
+
+@dataclass
+class FormLimits:
+    max_body_size: int | None = None
+    max_files: int | None = None
+    max_fields: int | None = None
+    spool_size: int = DEFAULT_SPOOL_SIZE
+
+
+class FormError(HTTPException):
+    """The body of a form request could not be read."""
+
+    def __init__(self, detail: str, status_code: int = 400):
+        super().__init__(status_code, detail)
+
+
+class FormLimitExceeded(FormError):
+    def __init__(self, detail: str):
+        super().__init__(detail, 413)
+
+
+def _decode(value: bytes, charset: str):
+    try:
+        return value.decode(charset)
+    except (UnicodeDecodeError, LookupError):
+        return value.decode("latin-1")
+
+
+async def _read_body(request: Request, max_body_size: int | None):
+    if max_body_size is not None:
+        # Refused before reading anything, when the client says how much it sends
+        length = request.headers.get("content-length", "")
+        if length.isdigit() and int(length) > max_body_size:
+            raise FormLimitExceeded(f"Body is larger than {max_body_size} bytes")
+
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if max_body_size is not None and received > max_body_size:
+            raise FormLimitExceeded(f"Body is larger than {max_body_size} bytes")
+        if chunk:
+            yield chunk
+
+
+class _EventParser:
+    """Turns parser callbacks into a list of events, consumed after every chunk.
+
+    Events are ("field", name, value), ("file", name, filename, headers), followed
+    by ("data", chunk) for every chunk of the file and ("end",) once it is done.
+    """
+
+    def __init__(self, limits: FormLimits, charset: str):
+        self.limits = limits
+        self.charset = charset
+        self.events: list[FormEvent] = []
+        self.files = 0
+        self.fields = 0
+        self.name = b""
+        self.value = b""
+        self.header_name = b""
+        self.header_value = b""
+        self.headers: list[tuple[bytes, bytes]] = []
+        self.is_file = False
+
+    def count_field(self):
+        self.fields += 1
+        if self.limits.max_fields is not None and self.fields > self.limits.max_fields:
+            raise FormLimitExceeded(f"More than {self.limits.max_fields} fields")
+
+    def count_file(self):
+        self.files += 1
+        if self.limits.max_files is not None and self.files > self.limits.max_files:
+            raise FormLimitExceeded(f"More than {self.limits.max_files} files")
+
+    # application/x-www-form-urlencoded
+    def on_field_start(self):
+        self.count_field()
+        self.name = b""
+        self.value = b""
+
+    def on_field_name(self, data: bytes, start: int, end: int):
+        self.name += data[start:end]
+
+    def on_field_data(self, data: bytes, start: int, end: int):
+        self.value += data[start:end]
+
+    def on_field_end(self):
+        self.events.append(
+            (
+                "field",
+                unquote_plus(self.name.decode("latin-1")),
+                unquote_plus(self.value.decode("latin-1")),
+            )
+        )
+
+    # multipart/form-data
+    def on_part_begin(self):
+        self.headers = []
+        self.value = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_name += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        self.headers.append((self.header_name.lower(), self.header_value))
+        self.header_name = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        disposition = dict(self.headers).get(b"content-disposition")
+        _, options = parse_options_header(disposition)
+        if b"name" not in options:
+            raise FormError('The Content-Disposition header field "name" must be provided')
+
+        name = _decode(options[b"name"], self.charset)
+        self.is_file = b"filename" in options
+        if self.is_file:
+            self.count_file()
+            filename = _decode(options[b"filename"], self.charset)
+            self.events.append(("file", name, filename, Headers(raw=self.headers)))
+        else:
+            self.count_field()
+            self.name = options[b"name"]
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if self.is_file:
+            self.events.append(("data", data[start:end]))
+        else:
+            self.value += data[start:end]
+
+    def on_part_end(self):
+        if self.is_file:
+            self.events.append(("end",))
+        else:
+            self.events.append(
+                ("field", _decode(self.name, self.charset), _decode(self.value, self.charset))
+            )
+
+
+async def iter_form_events(request: Request, limits: FormLimits) -> AsyncGenerator[FormEvent, None]:
+    """Parses the form in the body of request as it is received, enforcing limits."""
+    content_type, params = parse_options_header(request.headers.get("content-type"))
+    charset = params.get(b"charset", b"utf-8").decode("latin-1")
+    events = _EventParser(limits, charset)
+
+    if content_type == b"multipart/form-data":
+        if b"boundary" not in params:
+            raise FormError("Missing boundary in multipart")
+        parser = multipart.MultipartParser(
+            params[b"boundary"],
+            {
+                "on_part_begin": events.on_part_begin,
+                "on_part_data": events.on_part_data,
+                "on_part_end": events.on_part_end,
+                "on_header_field": events.on_header_field,
+                "on_header_value": events.on_header_value,
+                "on_header_end": events.on_header_end,
+                "on_headers_finished": events.on_headers_finished,
+            },
+        )
+    elif content_type == b"application/x-www-form-urlencoded":
+        parser = multipart.QuerystringParser(
+            {
+                "on_field_start": events.on_field_start,
+                "on_field_name": events.on_field_name,
+                "on_field_data": events.on_field_data,
+                "on_field_end": events.on_field_end,
+            }
+        )
+    else:
+        # Same as Starlette, anything else is an empty form
+        return
+
+    try:
+        async for chunk in _read_body(request, limits.max_body_size):
+            parser.write(chunk)
+            for event in events.events:
+                yield event
+            events.events.clear()
+
+        parser.finalize()
+    except FormParserError as e:
+        raise FormError(f"Malformed form: {e}")
+
+    for event in events.events:
+        yield event
+
+
+async def read_form(request: Request, limits: FormLimits):
+    """Reads the whole form like Request.form() does, but within limits.
+
+    Files larger than limits.spool_size are written to disk as they arrive.
+    """
+    items: list[tuple[str, str | UploadFile]] = []
+    file: UploadFile | None = None
+    try:
+        async for event in iter_form_events(request, limits):
+            if event[0] == "field":
+                items.append((event[1], event[2]))
+            elif event[0] == "file":
+                file = UploadFile(
+                    SpooledTemporaryFile(max_size=limits.spool_size),  # type: ignore
+                    size=0,
+                    filename=event[2],
+                    headers=event[3],
+                )
+                items.append((event[1], file))
+            elif event[0] == "data":
+                await file.write(event[1])  # type: ignore
+            else:
+                await file.seek(0)  # type: ignore
+    except BaseException:
+        for _, value in items:
+            if isinstance(value, UploadFile):
+                await value.close()
+        raise
+
+    return FormData(items)
+
+
+@dataclass
+class FormField:
+    name: str
+    value: str
+
+
+class FormFile:
+    """A file of a streamed form, iterating over the chunks of it as they arrive.
+
+    Chunks must be read before moving on to the next part of the form, whatever is
+    left unread is skipped.
+    """
+
+    def __init__(self, stream: "FormStream", name: str, filename: str, headers: Headers):
+        self._stream = stream
+        self._done = False
+        self.name = name
+        self.filename = filename
+        self.headers = headers
+
+    @property
+    def content_type(self):
+        return self.headers.get("content-type")
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> bytes:
+        if self._done:
+            raise StopAsyncIteration
+
+        event = await anext(self._stream._events)
+        if event[0] == "data":
+            return event[1]
+
+        self._done = True
+        raise StopAsyncIteration
+
+    async def read(self):
+        """Reads the rest of the file into memory."""
+        return b"".join([chunk async for chunk in self])
+
+
+class FormStream:
+    """The form of a request, iterating over its fields and files as they arrive."""
+
+    def __init__(self, events: AsyncGenerator[FormEvent, None]):
+        self._events = events
+        self._file: FormFile | None = None
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> FormField | FormFile:
+        if self._file:
+            async for _ in self._file:
+                pass
+
+        event = await anext(self._events)
+        if event[0] == "field":
+            self._file = None
+            return FormField(event[1], event[2])
+
+        self._file = FormFile(self, event[1], event[2], event[3])
+        return self._file
+
+    async def fields(self):
+        """Reads the rest of the form, skipping files, into a dict of field values."""
+        return {part.name: part.value async for part in self if isinstance(part, FormField)}
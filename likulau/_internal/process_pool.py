@@ -0,0 +1,126 @@
+import asyncio
+import importlib
+import inspect
+import logging
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any
+
+import anyio.to_thread
+import liku
+
+from likulau.env import env
+from likulau._internal.templates import compile_module_templates
+
+logger = logging.getLogger("likulau.process_pool")
+
+# Page modules rendered in the pool, imported by every worker as it starts
+modules: set[str] = set()
+_pool: ProcessPoolExecutor | None = None
+_pool_size = 0
+
+
+def _init_worker(directory: str, warm_modules: list[str]):
+    os.chdir(directory)
+    if "." not in sys.path:
+        sys.path.append(".")
+
+    for module in warm_modules:
+        try:
+            compile_module_templates(importlib.import_module(module))
+        except Exception:
+            logger.exception(f"Failed to load {module} in render worker")
+
+
+def _ping():
+    return os.getpid()
+
+
+def _call(func, *args):
+    result = func(*args)
+    if inspect.isawaitable(result):
+        # Async pages get a short lived loop of their own in the worker
+        return asyncio.run(result)  # type: ignore
+    return result
+
+
+def _render(module: str, props: Any, fragment: str | None) -> bytes | None:
+    """Renders a page, along with its layout, inside a worker process."""
+    from likulau._internal.fragments import find_fragment
+
+    if module not in sys.modules:
+        compile_module_templates(importlib.import_module(module))
+    page_mod = sys.modules[module]
+    page_func = page_mod.page
+    if len(inspect.signature(page_func).parameters) == 1:
+        tree = _call(page_func, props)
+    else:
+        tree = _call(page_func)
+
+    if not isinstance(tree, liku.HTMLElement):
+        raise TypeError(f"{module}.page() must return HTMLElement to be rendered in a process pool")
+
+    if fragment:
+        tree = find_fragment(tree, fragment)
+        if not tree:
+            return None
+    elif fragment is None and hasattr(page_mod, "layout"):
+        tree = _call(page_mod.layout, props, tree)
+
+    return str(tree).encode()
+
+
+def get_pool():
+    global _pool, _pool_size
+    if not _pool:
+        _pool_size = env("PROCESS_POOL_SIZE", cast=int, default=os.cpu_count() or 1)
+        # Spawned rather than forked, forking a process running threads and an event
+        # loop is not safe.
+        _pool = ProcessPoolExecutor(
+            _pool_size,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(os.getcwd(), sorted(modules)),
+        )
+    return _pool
+
+
+def _warm():
+    pool = get_pool()
+    # Workers are started on demand, keep them all busy so every one of them starts
+    futures = [pool.submit(_ping) for _ in range(_pool_size)]
+    pids = {future.result() for future in futures}
+    logger.info(f"Started {len(pids)} render workers")
+
+
+async def render(module: str, props: Any, fragment: str | None):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), _render, module, props, fragment)
+
+
+def shutdown():
+    global _pool
+    if _pool:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
+
+def with_process_pool(lifespan):
+    """Wraps a Starlette lifespan to start render workers ahead of the first request,
+    when any page is rendered in them."""
+
+    @asynccontextmanager
+    async def inner(app):
+        if modules:
+            await anyio.to_thread.run_sync(_warm)
+
+        try:
+            async with lifespan(app) as state:
+                yield state
+        finally:
+            await anyio.to_thread.run_sync(shutdown)
+
+    return inner
@@ -0,0 +1,127 @@
+import cProfile
+import hashlib
+import hmac
+import logging
+import re
+import time
+from collections import deque
+from pathlib import Path
+from urllib.parse import parse_qs
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger("likulau.profiling")
+
+PROFILE_HEADER = "x-likulau-profile"
+PROFILE_QUERY = "liku-profile"
+PROFILE_QUERY_BYTES = PROFILE_QUERY.encode()
+DEFAULT_DIRECTORY = "profiles"
+DEFAULT_RATE = 10
+DEFAULT_TOKEN_TTL = 300
+
+
+def _signature(secret: str, expires: int):
+    return hmac.new(secret.encode(), str(expires).encode(), hashlib.sha256).hexdigest()
+
+
+def create_token(secret: str, ttl: int = DEFAULT_TOKEN_TTL):
+    """A token allowing whoever holds it to profile requests for the next ttl seconds."""
+    expires = int(time.time()) + ttl
+    return f"{expires}.{_signature(secret, expires)}"
+
+
+def verify_token(secret: str, token: str):
+    expires, _, signature = token.partition(".")
+    if not expires.isdigit() or int(expires) < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(secret, int(expires)))
+
+
+class RateLimit:
+    """Allows at most limit events in any sliding window of period seconds."""
+
+    def __init__(self, limit: int, period: float = 60):
+        self.limit = limit
+        self.period = period
+        self.events: deque[float] = deque()
+
+    def acquire(self):
+        now = time.monotonic()
+        while self.events and now - self.events[0] >= self.period:
+            self.events.popleft()
+
+        if len(self.events) >= self.limit:
+            return False
+        self.events.append(now)
+        return True
+
+
+def _requested_token(scope: Scope):
+    token = Headers(scope=scope).get(PROFILE_HEADER)
+    if token is None and PROFILE_QUERY_BYTES in scope["query_string"]:
+        values = parse_qs(scope["query_string"].decode("latin-1"), keep_blank_values=True)
+        token = values.get(PROFILE_QUERY, [None])[0]
+    return token
+
+
+class ProfilingMiddleware:
+    """Profiles requests with cProfile, writing a pstats file for each of them.
+
+    Every request is profiled when always is set. Otherwise only requests asking for
+    it through the x-likulau-profile header or the liku-profile query parameter are,
+    which must carry a token signed with secret unless running in debug mode. Either
+    way, at most rate profiles are taken every minute, one at a time.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        directory: str = DEFAULT_DIRECTORY,
+        rate: int = DEFAULT_RATE,
+        secret: str | None = None,
+        always: bool = False,
+        debug: bool = False,
+    ):
+        self.app = app
+        self.directory = Path(directory)
+        self.rate_limit = RateLimit(rate)
+        self.secret = secret
+        self.always = always
+        self.debug = debug
+        self.active = False
+
+    def _should_profile(self, scope: Scope):
+        if not self.always:
+            token = _requested_token(scope)
+            if token is None:
+                return False
+            if not self.debug and not (self.secret and verify_token(self.secret, token)):
+                return False
+
+        # The profiler hooks the whole interpreter, so only one may run at a time
+        return not self.active and self.rate_limit.acquire()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not self._should_profile(scope):
+            return await self.app(scope, receive, send)
+
+        slug = re.sub(r"[^\w.-]+", "_", scope["path"]).strip("_") or "index"
+        profile_file = self.directory / f"{time.time_ns()}-{scope['method']}-{slug}.prof"
+
+        async def wrapped_send(message: Message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message)[PROFILE_HEADER] = profile_file.name
+            await send(message)
+
+        self.active = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await self.app(scope, receive, wrapped_send)
+        finally:
+            profiler.disable()
+            self.active = False
+            self.directory.mkdir(parents=True, exist_ok=True)
+            profiler.dump_stats(profile_file)
+            logger.info(f"Profile of {scope['method']} {scope['path']} written to {profile_file}")
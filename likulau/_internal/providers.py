@@ -1,33 +1,84 @@
+import sys
 from contextlib import AsyncExitStack, asynccontextmanager
+from contextvars import Token
 from dataclasses import dataclass
 import importlib
 import inspect
-from pathlib import Path
+from typing import Any, Literal
 
+import anyio
 from liku.context import Context
 from likulau.types import ProviderFunction
-from likulau._internal.utils import run_async
+from likulau._internal.utils import iter_modules
 
+type ProviderScope = Literal["app", "request"]
 
-@dataclass
+
+@dataclass(slots=True)
 class Provider:
     ctx: Context
     provider: ProviderFunction
     dependencies: list[Context]
+    scope: ProviderScope = "request"
 
 
 app_providers: dict[Context, Provider] = {}
-resolve_queue: list[Context] = []
+# Contexts of app scoped providers, in the order they are entered on startup
+app_queue: list[Context] = []
+# Request scoped contexts grouped by depth in the dependency graph, providers in
+# the same level do not depend on each other and are entered concurrently
+resolve_levels: list[list[Context]] = []
+app_values: dict[Context, Any] = {}
 
 
-def setup_providers():
-    global app_providers, resolve_queue
+def has_providers():
+    return bool(app_providers)
 
-    providers: dict[Context, Provider] = {}
-    for page in Path("src/providers").glob("**/*.py"):
-        page = page.with_suffix("")
-        module = ".".join(page.parts)
 
+def _sort_providers(providers: dict[Context, Provider]):
+    for provider in providers.values():
+        for ctx_deps in provider.dependencies:
+            if ctx_deps not in providers:
+                raise Exception(
+                    f"Provider {provider.provider.__qualname__} depends on context "
+                    f"{ctx_deps.context.name}, but no provider exists for it"
+                )
+
+            if provider.scope == "app" and providers[ctx_deps].scope != "app":
+                raise Exception(
+                    f"App scoped provider {provider.provider.__qualname__} cannot depend "
+                    f"on request scoped context {ctx_deps.context.name}"
+                )
+
+    levels: list[list[Context]] = []
+    remaining = dict(providers)
+    resolved: set[Context] = set()
+    while remaining:
+        level = [
+            ctx
+            for ctx, provider in remaining.items()
+            if all(dep in resolved for dep in provider.dependencies)
+        ]
+        if not level:
+            cycle = ", ".join(ctx.context.name for ctx in remaining)
+            raise Exception(f"Circular dependency between providers of: {cycle}")
+
+        for ctx in level:
+            del remaining[ctx]
+        resolved.update(level)
+        levels.append(level)
+
+    return levels
+
+
+def setup_providers(modules: list[str] | None = None):
+    global app_providers, app_queue, resolve_levels
+
+    if modules is None:
+        modules = [module for _, module in iter_modules("src/providers")]
+
+    providers: dict[Context, Provider] = {}
+    for module in modules:
         page_mod = importlib.import_module(module)
         provider_obj = None
         for _, obj in inspect.getmembers(page_mod):
@@ -43,32 +94,176 @@ def setup_providers():
             provider_obj._ctx,
             provider_obj,
             provider_obj._deps,
+            provider_obj._scope,
         )
         providers[provider.ctx] = provider
 
     if not providers:
         return
 
-    queue: list[Context] = []
-    for provider in providers.values():
-        for ctx_deps in provider.dependencies:
-            if ctx_deps not in queue:
-                queue.append(ctx_deps)
+    levels = _sort_providers(providers)
+    app_providers = providers
+    app_queue = [
+        ctx for level in levels for ctx in level if providers[ctx].scope == "app"
+    ]
+    resolve_levels = [
+        request_level
+        for level in levels
+        if (request_level := [ctx for ctx in level if providers[ctx].scope == "request"])
+    ]
 
-        queue.append(provider.ctx)
 
-    app_providers = providers
-    resolve_queue = queue
+async def _enter_provider(stack: AsyncExitStack, provider: Provider):
+    # Provider functions only build the context manager, any real work happens on
+    # enter, so there is no need to hop to a thread for sync ones.
+    if inspect.iscoroutinefunction(provider.provider):
+        ctx_manager = await provider.provider()
+    else:
+        ctx_manager = provider.provider()
+
+    if hasattr(ctx_manager, "__aenter__"):
+        await stack.enter_async_context(ctx_manager)  # type: ignore
+    else:
+        stack.enter_context(ctx_manager)  # type: ignore
+
+    try:
+        return provider.ctx.context.get()
+    except LookupError as e:
+        raise Exception(
+            f"Provider {provider.provider.__qualname__} did not provide a value for "
+            f"context {provider.ctx.context.name}"
+        ) from e
 
 
 @asynccontextmanager
-async def provide_all():
+async def provide_app():
+    """Enters all app scoped providers, for the whole lifetime of the application."""
     async with AsyncExitStack() as stack:
-        for ctx in resolve_queue:
-            ctx_manager = await run_async(app_providers[ctx].provider)
-            if hasattr(ctx_manager, "__aenter__"):
-                await stack.enter_async_context(ctx_manager)  # type: ignore
-            else:
-                stack.enter_context(ctx_manager)  # type: ignore
-
-        yield
+        for ctx in app_queue:
+            app_values[ctx] = await _enter_provider(stack, app_providers[ctx])
+
+        try:
+            yield
+        finally:
+            app_values.clear()
+
+
+def with_app_providers(lifespan=None):
+    """Wraps a Starlette lifespan so app scoped providers are entered around it."""
+
+    @asynccontextmanager
+    async def inner(app):
+        async with provide_app():
+            if not lifespan:
+                yield
+                return
+
+            async with lifespan(app) as state:
+                yield state
+
+    return inner
+
+
+async def _hold_provider(
+    provider: Provider,
+    values: dict[Context, Any],
+    entered: anyio.Event,
+    release: anyio.Event,
+    exc_info: list[Any],
+):
+    stack = AsyncExitStack()
+    try:
+        values[provider.ctx] = await _enter_provider(stack, provider)
+        entered.set()
+        await release.wait()
+    except BaseException:
+        if not await stack.__aexit__(*sys.exc_info()):
+            raise
+        return
+
+    # Exited with whatever the request raised, as a provider in a level of its own is
+    await stack.__aexit__(*exc_info)
+
+
+@asynccontextmanager
+async def _provide_level(level: list[Context]):
+    # Context variables set inside a task do not leak to its parent, so each provider
+    # is held open by its own task while the value it provided is copied over.
+    values: dict[Context, Any] = {}
+    release = anyio.Event()
+    exc_info: list[Any] = [None, None, None]
+    exc: BaseException | None = None
+    try:
+        async with anyio.create_task_group() as tg:
+            events = []
+            for ctx in level:
+                entered = anyio.Event()
+                events.append(entered)
+                tg.start_soon(
+                    _hold_provider, app_providers[ctx], values, entered, release, exc_info
+                )
+
+            try:
+                for entered in events:
+                    await entered.wait()
+
+                tokens = [(ctx, ctx.context.set(value)) for ctx, value in values.items()]
+                try:
+                    yield
+                finally:
+                    for ctx, token in reversed(tokens):
+                        ctx.context.reset(token)
+            except BaseException as e:
+                exc = e
+                exc_info[:] = [type(e), e, e.__traceback__]
+            finally:
+                release.set()
+    except BaseExceptionGroup as e:
+        if len(e.exceptions) == 1:
+            raise e.exceptions[0] from None
+        raise
+
+    if exc:
+        raise exc
+
+
+class RequestScope:
+    """Enters request scoped providers, on top of the values of app scoped ones."""
+
+    __slots__ = ("stack", "tokens", "entered")
+
+    def __init__(self):
+        self.stack = AsyncExitStack()
+        self.tokens: list[tuple[Context, Token]] = []
+        self.entered = False
+
+    async def __aenter__(self):
+        for ctx, value in app_values.items():
+            self.tokens.append((ctx, ctx.context.set(value)))
+
+        # With app scoped providers only, there is nothing to exit
+        if not resolve_levels:
+            return
+
+        self.entered = True
+        try:
+            for level in resolve_levels:
+                if len(level) == 1:
+                    await _enter_provider(self.stack, app_providers[level[0]])
+                else:
+                    await self.stack.enter_async_context(_provide_level(level))
+        except BaseException:
+            await self.__aexit__(*sys.exc_info())
+            raise
+
+    async def __aexit__(self, exc_type, exc, tb):
+        try:
+            if self.entered:
+                return await self.stack.__aexit__(exc_type, exc, tb)
+        finally:
+            for ctx, token in reversed(self.tokens):
+                ctx.context.reset(token)
+
+
+def provide_all():
+    return RequestScope()
@@ -0,0 +1,129 @@
+import re
+
+from starlette._utils import get_route_path
+from starlette.datastructures import URL
+from starlette.responses import RedirectResponse
+from starlette.routing import BaseRoute, Match, Route, Router
+from starlette.types import Receive, Scope, Send
+
+# A whole segment made of a single parameter, such as {post_id} or {post_id:int}
+PARAM_SEGMENT = re.compile(r"^\{\w+(?::(?!path\})\w+)?\}$")
+
+
+class _Node:
+    def __init__(self):
+        self.static: dict[str, _Node] = {}
+        self.param: _Node | None = None
+        self.routes: list[int] = []
+
+    def insert(self, segments: list[str], index: int):
+        node = self
+        for segment in segments:
+            if PARAM_SEGMENT.match(segment):
+                if not node.param:
+                    node.param = _Node()
+                node = node.param
+            else:
+                node = node.static.setdefault(segment, _Node())
+        node.routes.append(index)
+
+    def collect(self, segments: list[str], depth: int, found: list[int]):
+        if depth == len(segments):
+            found += self.routes
+            return
+
+        static = self.static.get(segments[depth])
+        if static:
+            static.collect(segments, depth + 1, found)
+        # Parameters never match empty segments
+        if self.param and segments[depth]:
+            self.param.collect(segments, depth + 1, found)
+
+
+class _RouteIndex:
+    def __init__(self, routes: list[BaseRoute]):
+        self.size = len(routes)
+        self.root = _Node()
+        # Routes the tree cannot represent, tried for every path
+        self.fallback: list[int] = []
+        for index, route in enumerate(routes):
+            segments = _split(route.path) if isinstance(route, Route) else None
+            if segments is None or any(
+                "{" in segment and not PARAM_SEGMENT.match(segment) for segment in segments
+            ):
+                self.fallback.append(index)
+            else:
+                self.root.insert(segments, index)
+
+    def candidates(self, path: str):
+        found = list(self.fallback)
+        self.root.collect(_split(path), 0, found)
+        found.sort()
+        return found
+
+
+def _split(path: str):
+    return path.split("/")[1:]
+
+
+class SegmentRouter(Router):
+    """A router that finds the routes that could match a path with a segment tree,
+    instead of trying every route in turn.
+
+    Static segments are looked up by name, falling back to parameters. Candidates
+    are still tried in the order of the route list, so precedence and url_path_for
+    behave exactly as with the default router.
+    """
+
+    _index: _RouteIndex | None = None
+
+    def invalidate(self):
+        """Rebuilds the tree on the next request, for when routes were replaced in place."""
+        self._index = None
+
+    def _candidates(self, path: str):
+        # Routes added after the first request, for example by src/app.py, are picked up
+        if not self._index or self._index.size != len(self.routes):
+            self._index = _RouteIndex(self.routes)
+        return [self.routes[index] for index in self._index.candidates(path)]
+
+    async def app(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            return await super().app(scope, receive, send)
+
+        if "router" not in scope:
+            scope["router"] = self
+        route_path = get_route_path(scope)
+
+        partial = None
+        partial_scope = {}
+        for route in self._candidates(route_path):
+            match, child_scope = route.matches(scope)
+            if match == Match.FULL:
+                scope.update(child_scope)
+                await route.handle(scope, receive, send)
+                return
+            elif match == Match.PARTIAL and partial is None:
+                partial = route
+                partial_scope = child_scope
+
+        if partial is not None:
+            scope.update(partial_scope)
+            await partial.handle(scope, receive, send)
+            return
+
+        if scope["type"] == "http" and self.redirect_slashes and route_path != "/":
+            redirect_scope = dict(scope)
+            if route_path.endswith("/"):
+                redirect_scope["path"] = redirect_scope["path"].rstrip("/")
+            else:
+                redirect_scope["path"] = redirect_scope["path"] + "/"
+
+            for route in self._candidates(get_route_path(redirect_scope)):
+                match, _ = route.matches(redirect_scope)
+                if match != Match.NONE:
+                    response = RedirectResponse(url=str(URL(scope=redirect_scope)))
+                    await response(scope, receive, send)
+                    return
+
+        await self.default(scope, receive, send)
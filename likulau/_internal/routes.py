@@ -4,25 +4,105 @@ import logging
 import re
 import sys
 import typing
-from dataclasses import dataclass
+from collections.abc import Awaitable, Callable
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
 from pathlib import Path
 from types import ModuleType
 
 import liku
+from starlette.exceptions import HTTPException
 from starlette.requests import Request
-from starlette.responses import HTMLResponse, Response
+from starlette.responses import HTMLResponse, Response, StreamingResponse
 from starlette.routing import Route
 
 from likulau.hooks import RequestContext
-from likulau._internal.providers import provide_all
-from likulau.types import LayoutFunction, PageFunction, SSRFunction, StaticPathsFunction
-from likulau._internal.utils import run_async
+from likulau._internal import metrics, process_pool
+from likulau._internal.cache import CacheBackend, CachePolicy, with_response_cache
+from likulau._internal.coalesce import coalesced
+from likulau._internal.form_rpc import register_module_rpcs
+from likulau._internal.fragments import requested_fragment, select_fragment
+from likulau._internal.etag import compile_version, etag_matches, not_modified, with_etag
+from likulau._internal.isr import RenderCache, with_render_cache
+from likulau._internal.providers import has_providers, provide_all
+from likulau._internal.streaming import Slot, discard, iter_html
+from likulau._internal.templates import compile_module_templates
+from likulau.types import (
+    LayoutFunction,
+    PageFunction,
+    SSRFunction,
+    StaticPathsFunction,
+    VersionFunction,
+)
+from likulau._internal.utils import iter_modules, to_async
 
 sys.path.append(".")
 logger = logging.getLogger("likulau.routes")
+request_var = RequestContext.context
 
 
-@dataclass
+@contextmanager
+def provide_request(request: Request):
+    token = request_var.set(request)
+    try:
+        yield
+    finally:
+        request_var.reset(token)
+
+
+@dataclass(frozen=True, slots=True)
+class CallPlan:
+    """Everything a request needs to know about a route, resolved once at discovery."""
+
+    page: Callable[..., Awaitable[typing.Any]]
+    page_takes_props: bool
+    ssr_props: Callable[[Request], Awaitable[typing.Any]] | None
+    layout: Callable[[typing.Any, liku.HTMLElement], Awaitable[typing.Any]] | None
+    needs_providers: bool
+    etag: Callable[[typing.Any, str | None], Awaitable[str]] | None = None
+    serialize: Callable[[liku.HTMLElement], str] = str
+    provide: Callable[[], typing.AsyncContextManager[None]] = provide_all
+
+
+def compile_call_plan(route: "LikulauRoute"):
+    executor = getattr(route.page_func, "_executor", None)
+
+    ssr_props = None
+    if route.ssr_props_func:
+        ssr_props = to_async(route.ssr_props_func, executor)
+        if hasattr(route.ssr_props_func, "_coalesce"):
+            ssr_props = coalesced(route.path, ssr_props, route.ssr_props_func._coalesce)
+
+    page = to_async(route.page_func)
+    layout = to_async(route.layout_func, executor) if route.layout_func else None
+    etag = compile_version(route.version_func, executor) if route.version_func else None
+    serialize = str
+    provide = provide_all
+    if metrics.enabled:
+        # Only pay for timing when it was asked for
+        page = metrics.timed(route.path, "page", page)
+        if ssr_props:
+            ssr_props = metrics.timed(route.path, "ssr_props", ssr_props)
+        if layout:
+            layout = metrics.timed(route.path, "layout", layout)
+        if etag:
+            etag = metrics.timed(route.path, "version", etag)
+        serialize = metrics.timed_sync(route.path, "serialize", str)
+        provide = metrics.timed_context(route.path, "providers", provide_all)
+
+    return CallPlan(
+        page=page,
+        page_takes_props=len(inspect.signature(route.page_func).parameters) == 1,
+        ssr_props=ssr_props,
+        layout=layout,
+        needs_providers=has_providers(),
+        etag=etag,
+        serialize=serialize,
+        provide=provide,
+    )
+
+
+@dataclass(slots=True)
 class LikulauRoute[PropsType]:
     path: str
     page_func: PageFunction[PropsType]
@@ -30,9 +110,25 @@ class LikulauRoute[PropsType]:
     ssr_props_func: SSRFunction[PropsType] | None = None
     layout_func: LayoutFunction | None = None
     methods: list[str] | None = None
+    streaming: int | None = None
+    revalidate: float | None = None
+    cache: CachePolicy | None = None
+    version_func: VersionFunction[PropsType] | None = None
+    plan: CallPlan = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self.plan = compile_call_plan(self)
 
-    def create_router_func(self):
-        route = Route(self.path, create_route(self), methods=self.methods)
+    def create_router_func(
+        self,
+        render_cache: RenderCache | None = None,
+        cache_backend: CacheBackend | None = None,
+    ):
+        route = Route(
+            self.path,
+            create_route(self, render_cache, cache_backend),
+            methods=self.methods,
+        )
         route._likulau_route_info = self # type: ignore (intended for app builder)
         return route
 
@@ -42,19 +138,28 @@ def _sort_route(route: LikulauRoute):
     return (has_parameter, route.path)
 
 
-def _process_page_module(page_mod: ModuleType):
+def _process_page_module(page_mod: ModuleType, validate: bool = True):
+    """Collects the functions of a page module.
+
+    Type validation can be skipped for modules that have already been validated
+    when the route manifest was compiled.
+    """
     if not hasattr(page_mod, "page"):
         raise Exception(f"Missing page() function in {page_mod.__name__}")
 
+    register_module_rpcs(page_mod, validate)
+    compile_module_templates(page_mod)
+
     props_type = None
     ssr_props_func = None
     if hasattr(page_mod, "get_ssr_props"):
         ssr_props_func = page_mod.get_ssr_props
-        props_type = typing.get_type_hints(ssr_props_func).get("return")
-        if not props_type:
-            raise Exception(
-                f"Could not determine props type for module {page_mod.__name__}"
-            )
+        if validate:
+            props_type = typing.get_type_hints(ssr_props_func).get("return")
+            if not props_type:
+                raise Exception(
+                    f"Could not determine props type for module {page_mod.__name__}"
+                )
 
     static_paths_func = None
     if hasattr(page_mod, "get_static_paths"):
@@ -63,77 +168,296 @@ def _process_page_module(page_mod: ModuleType):
     layout_func = None
     if hasattr(page_mod, "layout"):
         layout_func = page_mod.layout
-        layout_props_type = typing.get_type_hints(layout_func).get("props")
-        if layout_props_type != props_type:
-            raise Exception(
-                "Props type returned from get_ssr_props() does not match layout(). "
-                f"({layout_props_type} != {props_type})",
-            )
+        if validate:
+            layout_props_type = typing.get_type_hints(layout_func).get("props")
+            if layout_props_type != props_type:
+                raise Exception(
+                    "Props type returned from get_ssr_props() does not match layout(). "
+                    f"({layout_props_type} != {props_type})",
+                )
 
     page_func = page_mod.page
-    types = typing.get_type_hints(page_func)
-    # TODO: Is there any way for us to check the distribution better?
-    if types.get("return") not in (
-        liku.HTMLElement,
-        Response,
-        liku.HTMLElement | Response,
-    ):
-        raise Exception(
-            f"{page_mod.__name__}.page() does not have correct return type."
-            f"Expected HTMLElement | Response, got {types.get('return')}"
-        )
+    if validate:
+        types = typing.get_type_hints(page_func)
+        # TODO: Is there any way for us to check the distribution better?
+        if types.get("return") not in (
+            liku.HTMLElement,
+            Response,
+            liku.HTMLElement | Response,
+        ):
+            raise Exception(
+                f"{page_mod.__name__}.page() does not have correct return type."
+                f"Expected HTMLElement | Response, got {types.get('return')}"
+            )
 
-    if types.get("props") != props_type:
-        raise Exception(
-            "Props type returned from get_ssr_props() does not match main(). "
-            f"({types.get('props')} != {props_type})",
-        )
+        if types.get("props") != props_type:
+            raise Exception(
+                "Props type returned from get_ssr_props() does not match main(). "
+                f"({types.get('props')} != {props_type})",
+            )
 
     methods = None
     if hasattr(page_func, "_methods"):
         methods = page_func._methods
 
-    return page_func, static_paths_func, ssr_props_func, layout_func, methods
+    streaming = None
+    if hasattr(page_func, "_streaming"):
+        streaming = page_func._streaming
+        if getattr(page_func, "_process_pool", False):
+            raise Exception(
+                f"{page_mod.__name__}.page() cannot be both streaming and rendered in a process pool"
+            )
+
+    revalidate = getattr(page_mod, "revalidate", None)
+
+    cache = None
+    if hasattr(page_func, "_cache"):
+        cache = page_func._cache
+
+    version_func = None
+    if hasattr(page_mod, "get_version"):
+        version_func = page_mod.get_version
+        if validate and len(inspect.signature(version_func).parameters) > 1:
+            raise Exception(
+                f"{page_mod.__name__}.get_version() must take the props, or nothing at all"
+            )
+
+    return (
+        page_func,
+        static_paths_func,
+        ssr_props_func,
+        layout_func,
+        methods,
+        streaming,
+        revalidate,
+        cache,
+        version_func,
+    )
+
+
+def _page_path(page: Path):
+    page_path = "/".join(page.parts[2:]).replace("[", "{").replace("]", "}")
+    if page.stem == "index":
+        page_path = "/".join(page_path.split("/")[:-1])
+
+    return "/" + page_path
 
 
 def discover_pages():
     routes: list[LikulauRoute] = []
-    for page in Path("src/pages").glob("**/*.py"):
-        page = page.with_suffix("")
-        module = ".".join(page.parts)
+    for page, module in iter_modules("src/pages"):
         logger.debug(f"Loading: {str(page)} (Module {module})")
 
         page_mod = importlib.import_module(module)
         page_func = _process_page_module(page_mod)
-
-        page_path = "/".join(page.parts[2:]).replace("[", "{").replace("]", "}")
-        if page.stem == "index":
-            page_path = "/".join(page_path.split("/")[:-1])
-
-        page_path = "/" + page_path
-        routes.append(LikulauRoute(page_path, *page_func))
+        routes.append(LikulauRoute(_page_path(page), *page_func))
     routes.sort(key=_sort_route)
     return routes
 
 
-def create_route(route: LikulauRoute):
+def create_lazy_router_func(
+    path: str,
+    module: str,
+    methods: list[str] | None,
+    render_cache: RenderCache | None = None,
+    cache_backend: CacheBackend | None = None,
+):
+    """Creates a route whose page module is only imported once it is needed.
+
+    Returns the route, along with a function that loads it ahead of time.
+    """
+    handler = None
+
+    def load():
+        nonlocal handler
+        if handler:
+            return
+
+        page_mod = importlib.import_module(module)
+        route_info = LikulauRoute(path, *_process_page_module(page_mod, validate=False))
+        handler = create_route(route_info, render_cache, cache_backend)
+        route._likulau_route_info = route_info  # type: ignore (intended for app builder)
+
+    async def endpoint(request: Request):
+        if not handler:
+            load()
+        return await handler(request)  # type: ignore
+
+    route = Route(path, endpoint, methods=methods)
+    route._likulau_route_info = None  # type: ignore (intended for app builder)
+    return route, load
+
+
+def create_route(
+    route: LikulauRoute,
+    render_cache: RenderCache | None = None,
+    cache_backend: CacheBackend | None = None,
+):
+    if route.streaming:
+        handler = create_streaming_route(route)
+    else:
+        if getattr(route.page_func, "_process_pool", False):
+            handler = create_process_handler(route)
+        else:
+            handler = create_page_handler(route)
+        if cache_backend and route.cache:
+            handler = with_response_cache(route, handler, cache_backend)
+        if render_cache and route.static_paths_func:
+            handler = with_render_cache(route, handler, render_cache)
+
+    handler = with_etag(handler)
+    if metrics.enabled:
+        handler = metrics.labelled(route.path, handler)
+    return handler
+
+
+def create_page_handler(route: LikulauRoute):
+    plan = route.plan
+
+    async def render(props, fragment: str | None):
+        if plan.page_takes_props:
+            response = await plan.page(props)
+        else:
+            response = await plan.page()
+
+        if isinstance(response, liku.HTMLElement):
+            if fragment is not None:
+                # Only part of the page was asked for, the layout is left out
+                response = select_fragment(response, fragment)
+            elif plan.layout:
+                response = await plan.layout(props, response)
+            response = HTMLResponse(plan.serialize(response))
+
+        return response
+
     async def inner(request: Request):
         props = None
-        if route.ssr_props_func:
-            props = await run_async(route.ssr_props_func, request)
+        if plan.ssr_props:
+            props = await plan.ssr_props(request)
 
-        with RequestContext.provide(request):
-            async with provide_all():
-                if len(inspect.signature(route.page_func).parameters) == 1:
-                    response = await run_async(route.page_func, props)  # type: ignore
-                else:
-                    response = await run_async(route.page_func)  # type: ignore
+        fragment = requested_fragment(request)
+        etag = None
+        if plan.etag:
+            # Unchanged version, the client already has this page
+            etag = await plan.etag(props, fragment)
+            if etag_matches(request, etag):
+                return not_modified({"etag": etag})
 
-                if isinstance(response, liku.HTMLElement):
-                    if route.layout_func:
-                        response = await run_async(route.layout_func, props, response)
-                    response = HTMLResponse(str(response))
+        # Set directly rather than through RequestContext.provide(), which allocates a
+        # copy of the context and a generator on every request
+        token = request_var.set(request)
+        try:
+            if not plan.needs_providers:
+                response = await render(props, fragment)
+            else:
+                async with plan.provide():
+                    response = await render(props, fragment)
+        finally:
+            request_var.reset(token)
 
+        if etag and response.status_code == 200 and "etag" not in response.headers:
+            response.headers["etag"] = etag
         return response
 
     return inner
+
+
+def create_process_handler(route: LikulauRoute):
+    plan = route.plan
+    module = route.page_func.__module__
+    process_pool.modules.add(module)
+
+    render = process_pool.render
+    if metrics.enabled:
+        render = metrics.timed(route.path, "process_render", render)
+
+    async def inner(request: Request):
+        props = None
+        if plan.ssr_props:
+            props = await plan.ssr_props(request)
+
+        fragment = requested_fragment(request)
+        headers = None
+        if plan.etag:
+            etag = await plan.etag(props, fragment)
+            if etag_matches(request, etag):
+                return not_modified({"etag": etag})
+            headers = {"etag": etag}
+
+        body = await render(module, props, fragment)
+        if body is None:
+            raise HTTPException(404, f"No fragment named {fragment}")
+        return HTMLResponse(body, headers=headers)
+
+    return inner
+
+
+def create_streaming_route(route: LikulauRoute):
+    plan = route.plan
+
+    async def render_page(props):
+        if plan.page_takes_props:
+            response = await plan.page(props)
+        else:
+            response = await plan.page()
+
+        if not isinstance(response, liku.HTMLElement):
+            raise TypeError(
+                f"Streaming page {route.path} must return HTMLElement, got {type(response)}"
+            )
+        return response
+
+    async def body(request: Request, props):
+        with provide_request(request):
+            async with plan.provide() if plan.needs_providers else nullcontext():
+                # The layout receives a slot in place of the page, so its shell
+                # can be flushed before the page itself is rendered.
+                slot = Slot(render_page(props))
+                tree = slot
+                try:
+                    if plan.layout:
+                        tree = await plan.layout(props, slot)
+                        if not isinstance(tree, liku.HTMLElement):
+                            raise TypeError(
+                                f"Layout of streaming page {route.path} must return HTMLElement, got {type(tree)}"
+                            )
+
+                    async for chunk in iter_html(tree, route.streaming):  # type: ignore
+                        yield chunk
+                finally:
+                    # The layout may drop the page, or the client may leave midway
+                    discard([slot, tree])
+
+    async def render_fragment(request: Request, props, fragment: str):
+        # Fragments are small, they are sent in one go without the layout
+        with provide_request(request):
+            async with plan.provide() if plan.needs_providers else nullcontext():
+                page = await render_page(props)
+                try:
+                    tree = select_fragment(page, fragment)
+                    # The tree may still hold awaitables, which only iter_html() resolves
+                    return "".join([chunk async for chunk in iter_html(tree, route.streaming)])  # type: ignore
+                finally:
+                    # Awaitables outside the fragment are never reached
+                    discard(page)
+
+    async def inner(request: Request):
+        props = None
+        if plan.ssr_props:
+            props = await plan.ssr_props(request)
+
+        fragment = requested_fragment(request)
+        headers = None
+        if plan.etag:
+            etag = await plan.etag(props, fragment)
+            if etag_matches(request, etag):
+                return not_modified({"etag": etag})
+            headers = {"etag": etag}
+
+        if fragment is not None:
+            content = await render_fragment(request, props, fragment)
+            return HTMLResponse(content, headers=headers)
+
+        return StreamingResponse(body(request, props), media_type="text/html", headers=headers)
+
+    return inner
@@ -0,0 +1,77 @@
+import mimetypes
+import os
+import re
+from os import PathLike
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from likulau._internal.compression import accepted_encodings
+
+# Files with a content hash in their name, such as app.3f2a9c1d.js, never change
+HASHED_ASSET = re.compile(r"\.[0-9a-fA-F]{8,}\.\w+$")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+SIBLING_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+
+
+class PrecompressedStaticFiles(StaticFiles):
+    """Static files that serve a .br or .gz sibling of the requested file when the
+    client accepts it, and strong ETags from the content hashes of a build."""
+
+    def __init__(self, *args, hashes: dict[str, str] | None = None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.hashes = hashes or {}
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        # Never expose dotfiles, such as the build manifest
+        if any(part.startswith(".") and part not in (".", "..") for part in path.split(os.sep)):
+            raise HTTPException(status_code=404)
+        return await super().get_response(path, scope)
+
+    def file_response(
+        self,
+        full_path: PathLike,
+        stat_result: os.stat_result,
+        scope: Scope,
+        status_code: int = 200,
+    ) -> Response:
+        request_headers = Headers(scope=scope)
+        full_path = os.fspath(full_path)
+        media_type = mimetypes.guess_type(full_path)[0] or "text/plain"
+
+        served_path = full_path
+        encoding = None
+        # Falls back to the next accepted encoding when a sibling was not worth writing
+        for accepted in accepted_encodings(request_headers):
+            sibling = full_path + SIBLING_SUFFIXES[accepted]
+            if os.path.isfile(sibling):
+                served_path = sibling
+                stat_result = os.stat(sibling)
+                encoding = accepted
+                break
+
+        response = FileResponse(
+            served_path,
+            status_code=status_code,
+            stat_result=stat_result,
+            media_type=media_type,
+        )
+        response.headers["vary"] = "Accept-Encoding"
+        if encoding:
+            response.headers["content-encoding"] = encoding
+
+        relative_path = os.path.relpath(full_path, self.directory or ".").replace(os.sep, "/")
+        content_hash = self.hashes.get(relative_path)
+        if content_hash:
+            etag = content_hash if not encoding else f"{content_hash}-{encoding}"
+            response.headers["etag"] = f'"{etag}"'
+
+        if HASHED_ASSET.search(full_path):
+            response.headers["cache-control"] = IMMUTABLE_CACHE_CONTROL
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
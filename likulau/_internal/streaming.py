@@ -0,0 +1,132 @@
+import asyncio
+import html as htmllib
+import inspect
+from collections.abc import AsyncIterator, Awaitable
+from typing import Any
+
+import liku
+from liku.elements import Fragment
+
+DEFAULT_CHUNK_SIZE = 4096
+_FLUSH = object()
+
+
+class Slot(Fragment):
+    """Placeholder element whose content is only awaited once the serializer reaches it.
+
+    Used to hand the layout a stand-in for the page, so the layout shell can be sent
+    before the page itself has been rendered.
+    """
+
+    def __init__(self, content: Awaitable[Any]):
+        super().__init__()
+        self.content = content
+        self.result: Any = None
+
+    def render(self):
+        raise RuntimeError("Slot can only be rendered through iter_html()")
+
+
+def _split_element(node: liku.HTMLElement) -> tuple[str, str] | None:
+    # Only liku's generated tag classes have a known constructor and closing tag,
+    # anything else gets serialized as a whole.
+    if not type(node).__qualname__.startswith("GenericComponent."):
+        return None
+
+    tag_name = type(node).__name__
+    shell = type(node)(props=node.props, safe=node.safe).render()
+    closing = f"</{tag_name}>"
+    if not shell.endswith(closing):
+        # Void element, nothing goes in between
+        return shell, ""
+
+    return shell[: -len(closing)], closing
+
+
+async def _walk(node: Any, escape: bool) -> AsyncIterator[Any]:
+    if node is None:
+        return
+
+    if inspect.isawaitable(node):
+        yield _FLUSH
+        node = await node
+
+    if isinstance(node, list):
+        for child in node:
+            async for piece in _walk(child, escape):
+                yield piece
+        return
+
+    if isinstance(node, Slot):
+        yield _FLUSH
+        node.result = await node.content
+        async for piece in _walk(node.result, False):
+            yield piece
+        return
+
+    if not isinstance(node, liku.HTMLElement):
+        yield htmllib.escape(node) if escape else node
+        return
+
+    if isinstance(node, Fragment):
+        async for piece in _walk(node.children, not node.safe):
+            yield piece
+        return
+
+    parts = _split_element(node)
+    if parts is None:
+        yield str(node)
+        return
+
+    opening, closing = parts
+    yield opening
+    if closing:
+        async for piece in _walk(node.children, not node.safe):
+            yield piece
+        yield closing
+
+
+def discard(node: Any):
+    """Closes the awaitables left in a tree that was not entirely serialized, such as
+    the parts of a page outside a fragment, or a page its layout did not place.
+
+    Coroutines that are never awaited would otherwise warn once collected.
+    """
+    if inspect.iscoroutine(node):
+        node.close()
+    elif isinstance(node, asyncio.Future):
+        node.cancel()
+    elif isinstance(node, list):
+        for child in node:
+            discard(child)
+    elif isinstance(node, Slot):
+        discard([node.content, node.result])
+    elif isinstance(node, liku.HTMLElement):
+        discard(getattr(node, "children", None))
+
+
+async def iter_html(node: Any, chunk_size: int = DEFAULT_CHUNK_SIZE) -> AsyncIterator[str]:
+    """Serializes a liku tree incrementally.
+
+    Chunks are emitted once at least `chunk_size` characters are buffered, and
+    whatever is buffered is flushed right before waiting on an awaitable inside the tree.
+    """
+    buffer: list[str] = []
+    size = 0
+    async for piece in _walk(node, False):
+        if piece is _FLUSH:
+            if buffer:
+                yield "".join(buffer)
+                buffer.clear()
+                size = 0
+            continue
+
+        buffer.append(piece)
+        size += len(piece)
+        if size >= chunk_size:
+            yield "".join(buffer)
+            buffer.clear()
+            size = 0
+
+    if buffer:
+        yield "".join(buffer)
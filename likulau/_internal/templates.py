@@ -0,0 +1,206 @@
+import re
+import sys
+from functools import lru_cache
+from types import ModuleType
+from typing import Any
+
+from liku import HTMLElement
+
+from likulau.env import env
+
+try:
+    from liku.htm import html as htm_html
+except ImportError:  # pragma: nocover
+    htm_html = None
+
+DEFAULT_MAX_TEMPLATES = 1024
+STATIC_NAME = "__likulau_static_{}"
+
+# Elements without content, which may be written without closing them
+VOID_ELEMENTS = {"area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "source", "track", "wbr"}
+# Elements whose content is text, never markup
+RAW_TEXT_ELEMENTS = {"script", "style", "textarea", "title"}
+
+TAG = re.compile(r"""<(/?)([A-Za-z][\w.:-]*)((?:[^>"']|"[^"]*"|'[^']*')*?)(/?)>""")
+ATTRIBUTE_NAME = re.compile(r"""(?:^|\s)([^\s=/>"']+)""")
+INTERPOLATION = "{{"
+
+
+def _is_dynamic_tag(name: str, attributes: str):
+    # Components are looked up by name, bound attributes (:name) and spreads are
+    # evaluated, and so is anything interpolated into the tag itself
+    if not re.fullmatch(r"[a-z][a-z0-9-]*", name):
+        return True
+    if INTERPOLATION in attributes:
+        return True
+    return any(
+        attribute.startswith((":", "..."))
+        for attribute in ATTRIBUTE_NAME.findall(re.sub(r"""("[^"]*"|'[^']*')""", "", attributes))
+    )
+
+
+def static_spans(source: str):
+    """Spans of the outermost elements of source that interpolate nothing.
+
+    Void and empty elements are left alone, splicing them in costs as much as
+    building them. Markup that cannot be followed gives no spans at all.
+    """
+    # Open elements, as [name, start, dynamic, has content]
+    stack: list[list[Any]] = []
+    spans: list[tuple[int, int]] = []
+    position = 0
+
+    def text(content: str):
+        if stack:
+            if INTERPOLATION in content:
+                stack[-1][2] = True
+            if content.strip():
+                stack[-1][3] = True
+
+    while True:
+        start = source.find("<", position)
+        if start == -1:
+            text(source[position:])
+            break
+        text(source[position:start])
+
+        if source.startswith("<!--", start):
+            end = source.find("-->", start)
+            if end == -1:
+                return []
+            # Comments are not rendered, yet what they interpolate is still evaluated
+            if INTERPOLATION in source[start:end]:
+                text(INTERPOLATION)
+            position = end + 3
+            continue
+
+        match = TAG.match(source, start)
+        if not match:
+            # A lone <, part of the text
+            text("<")
+            position = start + 1
+            continue
+
+        closing, name, attributes, self_closing = match.groups()
+        position = match.end()
+        if closing:
+            if not stack or stack[-1][0] != name:
+                return []
+            _, element_start, dynamic, has_content = stack.pop()
+            if not dynamic and has_content:
+                spans.append((element_start, position))
+            if stack:
+                stack[-1][2] = stack[-1][2] or dynamic
+                stack[-1][3] = True
+            continue
+
+        dynamic = _is_dynamic_tag(name, attributes)
+        if stack:
+            stack[-1][3] = True
+            stack[-1][2] = stack[-1][2] or dynamic
+        if self_closing or name.lower() in VOID_ELEMENTS:
+            continue
+
+        stack.append([name, start, dynamic, False])
+        if name.lower() in RAW_TEXT_ELEMENTS:
+            end = source.find(f"</{name}", position)
+            if end == -1:
+                return []
+            text(source[position:end])
+            position = end
+
+    if stack:
+        return []
+
+    # Elements inside a static element go with it
+    outermost: list[tuple[int, int]] = []
+    for span in sorted(spans, key=lambda span: (span[0], -span[1])):
+        if not outermost or span[0] >= outermost[-1][1]:
+            outermost.append(span)
+    return outermost
+
+
+class StaticHTML(HTMLElement):
+    """An element tree serialized ahead of time, rendered by splicing in its HTML."""
+
+    def __init__(self, html: str):
+        super().__init__(safe=True)
+        self.html = html
+
+    def render(self):
+        return self.html
+
+
+class CompiledTemplate:
+    """A liku.htm template whose static elements are serialized once, and spliced in
+    as interpolated values every time the template is rendered."""
+
+    __slots__ = ("source", "statics")
+
+    def __init__(self, source: str):
+        self.statics: dict[str, HTMLElement] = {}
+        parts: list[str] = []
+        position = 0
+        for index, (start, end) in enumerate(static_spans(source)):
+            name = STATIC_NAME.format(index)
+            self.statics[name] = StaticHTML(str(htm_html(source[start:end])))  # type: ignore
+            parts += [source[position:start], f"{{{{{name}}}}}"]
+            position = end
+        parts.append(source[position:])
+        self.source = "".join(parts)
+
+    def render(self, scope_globals: dict[str, Any], scope_locals: dict[str, Any]):
+        # Evaluated in a frame of its own, liku.htm reads the names used by the
+        # template from the frame calling it
+        scope = dict(scope_locals)
+        scope.update(self.statics)
+        scope["__likulau_htm"] = htm_html
+        scope["__likulau_source"] = self.source
+        return eval(_RENDER, scope_globals, scope)
+
+
+_RENDER = compile("__likulau_htm(__likulau_source)", "<likulau template>", "eval")
+
+
+@lru_cache(maxsize=DEFAULT_MAX_TEMPLATES)
+def compile_template(source: str):
+    return CompiledTemplate(source)
+
+
+def html(source: str) -> Any:
+    """Renders a liku.htm template, like liku.htm.html(), compiling it on its first use.
+
+    Elements of the template that interpolate nothing, such as navigation or forms
+    without bound values, are serialized once and only copied on later renders.
+    """
+    if htm_html is None:
+        raise Exception("liku.htm is not available, install liku with the htm extra")
+
+    frame = sys._getframe(1)
+    try:
+        return compile_template(source).render(frame.f_globals, frame.f_locals)
+    finally:
+        del frame
+
+
+def compile_module_templates(module: ModuleType):
+    """Makes module, along with the project modules it imports from, render its
+    liku.htm templates through html()."""
+    if htm_html is None or not env("COMPILE_TEMPLATES", cast=bool, default=True):
+        return
+
+    modules = {module}
+    for obj in vars(module).values():
+        if isinstance(obj, ModuleType):
+            modules.add(obj)
+        else:
+            imported = sys.modules.get(getattr(obj, "__module__", None) or "")
+            if imported:
+                modules.add(imported)
+
+    for imported in modules:
+        if imported.__name__ != "src" and not imported.__name__.startswith("src."):
+            continue
+        for name, obj in list(vars(imported).items()):
+            if obj is htm_html:
+                setattr(imported, name, html)
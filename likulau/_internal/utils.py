@@ -1,12 +1,53 @@
 from asyncio import iscoroutinefunction
 from collections.abc import Awaitable
+from functools import partial
+from pathlib import Path
 from typing import Callable
 
-from asyncer import asyncify
+from likulau._internal.executor import Executor, default_executor
 
 
-async def run_async[**P, T](func: Callable[P, T | Awaitable[T]], *args: P.args, **kwargs: P.kwargs) -> T:
+def _inline[**P, T](func: Callable[P, T]) -> Callable[P, Awaitable[T]]:
+    async def inner(*args: P.args, **kwargs: P.kwargs) -> T:
+        return func(*args, **kwargs)
+
+    return inner
+
+
+def to_async[**P, T](
+    func: Callable[P, T | Awaitable[T]], executor: Executor | None = None
+) -> Callable[P, Awaitable[T]]:
+    """Builds an async invoker for func once, so it can be reused on every call.
+
+    Sync functions are sent to their own executor if they have one, then the given
+    executor, then the default one. Functions marked inline run on the event loop.
+    """
     if iscoroutinefunction(func):
-        return await func(*args, **kwargs)
+        return func  # type: ignore
+
+    if getattr(func, "_inline", False):
+        return _inline(func)  # type: ignore
+
+    executor = getattr(func, "_executor", None) or executor or default_executor
+    return partial(executor.run, func)  # type: ignore
+
+
+async def run_async[**P, T](func: Callable[P, T | Awaitable[T]], *args: P.args, **kwargs: P.kwargs) -> T:
+    return await to_async(func)(*args, **kwargs)
+
+
+def output_file(target_directory: Path, url: str):
+    """Location of the built page for url inside target_directory."""
+    path = url.lstrip("/").rstrip("/")
+    target_file = target_directory.joinpath(path).resolve()
+    if not target_file.is_relative_to(target_directory):
+        raise ValueError("Path is invalid")
+
+    return target_file / "index.html"
+
 
-    return await asyncify(func)(*args, **kwargs)  # type: ignore
+def iter_modules(directory: str):
+    """Python files inside directory, along with their module names."""
+    for path in Path(directory).glob("**/*.py"):
+        path = path.with_suffix("")
+        yield path, ".".join(path.parts)
@@ -0,0 +1,244 @@
+import gc
+import importlib
+import logging
+import os
+import random
+import select
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+
+import uvicorn
+
+logger = logging.getLogger("likulau.workers")
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_GRACEFUL_TIMEOUT = 30
+# Ticks of the uvicorn main loop happen every 100ms
+HEARTBEAT_TICKS = 10
+
+
+def _resident_memory():
+    """Resident memory of the current process in bytes, or None where it cannot be read."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def _load_post_fork():
+    if not Path("src/app.py").exists():
+        return None
+    return getattr(importlib.import_module("src.app"), "post_fork", None)
+
+
+class WorkerServer(uvicorn.Server):
+    """A uvicorn server reporting to the supervisor that its event loop is alive, and
+    leaving gracefully once it uses more than max_memory bytes."""
+
+    def __init__(self, config: uvicorn.Config, heartbeat: int, max_memory: int | None):
+        super().__init__(config)
+        self.heartbeat = heartbeat
+        self.max_memory = max_memory
+
+    async def on_tick(self, counter: int) -> bool:
+        if counter % HEARTBEAT_TICKS == 0:
+            try:
+                os.write(self.heartbeat, b".")
+            except OSError:
+                # Supervisor is gone, nobody restarts us anymore
+                self.should_exit = True
+
+            if self.max_memory:
+                memory = _resident_memory()
+                if memory and memory > self.max_memory:
+                    logger.info(f"Worker uses {memory} bytes of memory, over the limit. Recycling.")
+                    self.should_exit = True
+
+        return await super().on_tick(counter)
+
+
+class Worker:
+    def __init__(self, worker_id: int, pid: int, heartbeat: int):
+        self.worker_id = worker_id
+        self.pid = pid
+        self.heartbeat = heartbeat
+        self.last_seen = time.monotonic()
+        self.terminated_at: float | None = None
+
+
+class PreforkSupervisor:
+    """Runs the app of config, created in this process, in forked worker processes.
+
+    Pages, error handlers and providers are imported once before forking, so workers
+    start serving right away and share that memory copy-on-write. Anything created
+    by the app lifespan, such as app-scoped providers and pools, is created in each
+    worker, after it is forked. Workers whose event loop stops responding for timeout
+    seconds, or that reach their request or memory limit, are replaced.
+    """
+
+    def __init__(
+        self,
+        config: uvicorn.Config,
+        workers: int,
+        timeout: int = DEFAULT_TIMEOUT,
+        graceful_timeout: int = DEFAULT_GRACEFUL_TIMEOUT,
+        max_memory: int | None = None,
+    ):
+        self.config = config
+        self.workers_count = workers
+        self.timeout = timeout
+        self.graceful_timeout = graceful_timeout
+        self.max_memory = max_memory
+        self.workers: dict[int, Worker] = {}
+        self.should_exit = False
+        self.post_fork = _load_post_fork()
+
+    def run(self):
+        sock = self.config.bind_socket()
+        # Objects created so far are never freed, keep the collector from touching them
+        # so their pages stay shared with the workers
+        gc.collect()
+        gc.freeze()
+
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        signal.signal(signal.SIGHUP, self._handle_reload)
+        logger.info(f"Started supervisor [{os.getpid()}], forking {self.workers_count} workers")
+
+        try:
+            while not self.should_exit:
+                while len(self.workers) < self.workers_count:
+                    self._spawn(sock)
+                self._watch()
+        finally:
+            self._stop()
+            sock.close()
+
+    def _handle_exit(self, sig, frame):
+        self.should_exit = True
+
+    def _handle_reload(self, sig, frame):
+        logger.info("Recycling every worker")
+        for worker in self.workers.values():
+            self._terminate(worker)
+
+    def _spawn(self, sock: socket.socket):
+        read, write = os.pipe()
+        os.set_blocking(read, False)
+        # Replacements take the place of the worker they replace
+        taken = {worker.worker_id for worker in self.workers.values()}
+        worker_id = min(set(range(self.workers_count)) - taken)
+        pid = os.fork()
+        if pid == 0:
+            os.close(read)
+            self._run_worker(sock, write, worker_id)
+
+        os.close(write)
+        self.workers[pid] = Worker(worker_id, pid, read)
+        logger.info(f"Started worker [{pid}]")
+
+    def _run_worker(self, sock: socket.socket, heartbeat: int, worker_id: int):
+        status = 0
+        try:
+            for worker in self.workers.values():
+                os.close(worker.heartbeat)
+            for sig in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP):
+                signal.signal(sig, signal.SIG_DFL)
+
+            if self.post_fork:
+                self.post_fork(worker_id)
+
+            config = self.config
+            if config.limit_max_requests:
+                # Spread recycling out, instead of every worker leaving at once
+                jitter = random.randint(0, config.limit_max_requests // 10)
+                config.limit_max_requests += jitter
+
+            WorkerServer(config, heartbeat, self.max_memory).run(sockets=[sock])
+        except BaseException:
+            logger.exception("Worker failed")
+            status = 1
+        finally:
+            sys.stdout.flush()
+            sys.stderr.flush()
+            # Never return into the supervisor loop, nor run its exit handlers
+            os._exit(status)
+
+    def _watch(self):
+        fds = [worker.heartbeat for worker in self.workers.values()]
+        try:
+            ready, _, _ = select.select(fds, [], [], 1)
+        except InterruptedError:
+            ready = []
+
+        now = time.monotonic()
+        for worker in list(self.workers.values()):
+            if worker.heartbeat in ready:
+                try:
+                    if os.read(worker.heartbeat, 1024):
+                        worker.last_seen = now
+                except BlockingIOError:
+                    pass
+
+            if worker.terminated_at is not None:
+                if now - worker.terminated_at > self.graceful_timeout:
+                    logger.warning(f"Worker [{worker.pid}] did not stop in time, killing it")
+                    self._kill(worker.pid, signal.SIGKILL)
+            elif now - worker.last_seen > self.timeout:
+                logger.warning(f"Worker [{worker.pid}] stopped responding, recycling it")
+                self._terminate(worker)
+
+        self._reap()
+
+    def _reap(self):
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+            worker = self.workers.pop(pid, None)
+            if worker:
+                os.close(worker.heartbeat)
+                if not self.should_exit:
+                    logger.info(
+                        f"Worker [{pid}] exited with status {os.waitstatus_to_exitcode(status)}, replacing it"
+                    )
+
+    def _terminate(self, worker: Worker):
+        if worker.terminated_at is None:
+            worker.terminated_at = time.monotonic()
+            self._kill(worker.pid, signal.SIGTERM)
+
+    def _kill(self, pid: int, sig: int):
+        try:
+            os.kill(pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def _stop(self):
+        logger.info("Stopping workers")
+        for worker in self.workers.values():
+            self._terminate(worker)
+
+        deadline = time.monotonic() + self.graceful_timeout
+        while self.workers and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for worker in self.workers.values():
+            self._kill(worker.pid, signal.SIGKILL)
+        while self.workers:
+            try:
+                pid, _ = os.waitpid(-1, 0)
+            except ChildProcessError:
+                break
+            worker = self.workers.pop(pid, None)
+            if worker:
+                os.close(worker.heartbeat)
@@ -5,47 +5,152 @@ from typing import cast
 
 from starlette.applications import Starlette
 from starlette.middleware import Middleware
-from starlette.routing import Mount, BaseRoute
-from starlette.staticfiles import StaticFiles
+from starlette.routing import Mount, BaseRoute, Route
 
-from likulau._internal.form_rpc import FormRPCMiddleware
+from likulau._internal.cache import DEFAULT_MAX_BYTES, CacheBackend, MemoryCache
+from likulau._internal.compression import DEFAULT_MINIMUM_SIZE, CompressionMiddleware
+from likulau._internal.form_rpc import RPC_SOURCES, FormRPCMiddleware
+from likulau._internal import metrics, process_pool
+from likulau._internal.process_pool import with_process_pool
+from likulau._internal.profiling import DEFAULT_DIRECTORY, DEFAULT_RATE, ProfilingMiddleware
+from likulau._internal.hot_reload import with_hot_reload
+from likulau._internal.isr import RenderCache
 from likulau.env import env
-from likulau._internal.errors import discover_error_handlers
-from likulau._internal.providers import setup_providers
-from likulau._internal.routes import discover_pages
+from likulau._internal.errors import (
+    create_lazy_error_handler,
+    discover_error_handlers,
+    with_static_error_pages,
+)
+from likulau._internal.manifest import load_route_manifest, with_warmup
+from likulau._internal.providers import setup_providers, with_app_providers
+from likulau._internal.router import SegmentRouter
+from likulau._internal.routes import create_lazy_router_func, discover_pages
+from likulau._internal.static import PrecompressedStaticFiles
 
 logger = logging.getLogger("likulau.app")
 
 
-def create_app():
-    logger.info("Discovering pages")
-    routes = discover_pages()
-
-    logger.info("Discovering error handlers")
-    exception_handlers = discover_error_handlers()
-
-    setup_providers()
-
+def create_app(isr: bool | None = None, lazy: bool = True):
     lifespan = None
+    cache_backend: CacheBackend | None = None
     if Path("src/app.py").exists():
         custom_app = importlib.import_module("src.app")
         if hasattr(custom_app, "lifespan"):
             lifespan = custom_app.lifespan
+        if hasattr(custom_app, "cache_backend"):
+            cache_backend = custom_app.cache_backend
+
+    if not cache_backend:
+        cache_backend = MemoryCache(env("CACHE_MAX_BYTES", cast=int, default=DEFAULT_MAX_BYTES))
+
+    if isr is None:
+        isr = env("ISR", cast=bool, default=False)
+
+    debug = env("DEBUG", cast=bool, default=False)
+    expose_metrics = env("METRICS", cast=bool, default=False)
+    if expose_metrics or debug:
+        # Before any route is compiled, so they are compiled with timing
+        metrics.enable()
+
+    render_cache = None
+    if isr:
+        logger.info("Serving pages with static paths from render cache")
+        render_cache = RenderCache(Path(env("ISR_SEED_DIRECTORY", default="dist")))
+
+    app_routes: list[BaseRoute]
+    lifespan = with_static_error_pages(with_process_pool(with_app_providers(lifespan)))
+    if env("HOT_RELOAD", cast=bool, default=False):
+        lifespan = with_hot_reload(lifespan, render_cache, cache_backend)
+    manifest = load_route_manifest() if lazy else None
+    if manifest:
+        logger.info("Loading routes from route manifest")
+        setup_providers(manifest["providers"])
+        RPC_SOURCES.update(manifest["rpc"])
+        process_pool.modules.update(
+            entry["module"] for entry in manifest["pages"] if entry["process_pool"]
+        )
+
+        loaders = []
+        app_routes = []
+        for entry in manifest["pages"]:
+            route, load = create_lazy_router_func(
+                entry["path"],
+                entry["module"],
+                entry["methods"],
+                render_cache,
+                cache_backend,
+            )
+            app_routes.append(route)
+            loaders.append(load)
+
+        exception_handlers = {}
+        for code, module in manifest["errors"].items():
+            exception_handlers[int(code)], load = create_lazy_error_handler(module)
+            loaders.append(load)
+
+        if env("WARM_PAGES", cast=bool, default=True):
+            modules = [entry["module"] for entry in manifest["pages"]]
+            modules += list(manifest["errors"].values())
+            lifespan = with_warmup(lifespan, modules, loaders)
+    else:
+        # Providers go first, so routes know whether they have any to enter
+        logger.info("Discovering providers")
+        setup_providers()
+
+        logger.info("Discovering pages")
+        routes = discover_pages()
+
+        logger.info("Discovering error handlers")
+        exception_handlers = discover_error_handlers()
+
+        app_routes = list(
+            map(lambda x: x.create_router_func(render_cache, cache_backend), routes)
+        )
 
-    app_routes: list[BaseRoute] = list(map(lambda x: x.create_router_func(), routes))
     if Path("static").exists() and Path("static").is_dir():
         app_routes.append(
-            Mount("/static", app=StaticFiles(directory="static"), name="static")
+            Mount("/static", app=PrecompressedStaticFiles(directory="static"), name="static")
+        )
+
+    if expose_metrics:
+        app_routes.insert(
+            0, Route(env("METRICS_PATH", default="/metrics"), metrics.metrics_endpoint)
+        )
+
+    middleware = [Middleware(FormRPCMiddleware)]
+    if env("COMPRESS", cast=bool, default=False):
+        minimum_size = env("COMPRESS_MIN_SIZE", cast=int, default=DEFAULT_MINIMUM_SIZE)
+        middleware.insert(0, Middleware(CompressionMiddleware, minimum_size=minimum_size))
+    if metrics.enabled:
+        middleware.insert(0, Middleware(metrics.MetricsMiddleware, server_timing=debug))
+
+    profile_always = env("PROFILE", cast=bool, default=False)
+    profile_secret = env("PROFILE_SECRET", default=None)
+    if profile_always or profile_secret or debug:
+        middleware.insert(
+            0,
+            Middleware(
+                ProfilingMiddleware,
+                directory=env("PROFILE_DIRECTORY", default=DEFAULT_DIRECTORY),
+                rate=env("PROFILE_RATE", cast=int, default=DEFAULT_RATE),
+                secret=profile_secret,
+                always=profile_always,
+                debug=debug,
+            ),
         )
 
     app = Starlette(
-        env("DEBUG", cast=bool, default=False),
+        debug,
         routes=app_routes,
         exception_handlers=exception_handlers,
         lifespan=lifespan,
-        middleware=[Middleware(FormRPCMiddleware)],
+        middleware=middleware,
     )
 
+    if env("SEGMENT_ROUTER", cast=bool, default=False):
+        # Swapped in before the middleware stack, which wraps the router, is built
+        app.router = SegmentRouter(routes=app_routes, lifespan=lifespan)
+
     if Path("src/app.py").exists():
         logger.info("Found custom app file, running")
         custom_app = importlib.import_module("src.app")
@@ -57,3 +162,25 @@ def create_app():
             )
 
     return cast(Starlette, app)
+
+
+def create_static_app():
+    """Serves the output of `likulau build` as is, picking precompressed files when possible."""
+    # The builder itself imports this module
+    from likulau._internal.build import MANIFEST_FILE, load_build_manifest
+
+    directory = Path(env("DIST_DIRECTORY", default="dist"))
+    if not (directory / MANIFEST_FILE).exists():
+        raise Exception(f"No build found in {directory}, run `likulau build` first!")
+
+    manifest = load_build_manifest(directory)
+    hashes = {entry["file"]: entry["hash"] for entry in manifest.get("pages", {}).values()}
+    hashes.update({entry["file"]: entry["hash"] for entry in manifest.get("errors", {}).values()})
+    hashes.update(manifest.get("assets", {}))
+
+    return Starlette(
+        env("DEBUG", cast=bool, default=False),
+        routes=[
+            Mount("/", app=PrecompressedStaticFiles(directory=directory, html=True, hashes=hashes))
+        ],
+    )
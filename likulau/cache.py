@@ -0,0 +1,6 @@
+from likulau._internal.cache import CacheBackend, CacheStats, MemoryCache, response_caches
+
+
+def cache_stats() -> dict[str, CacheStats]:
+    """Hit and miss counters of every cached route, by route path."""
+    return {path: cache.stats() for path, cache in response_caches.items()}
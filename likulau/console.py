@@ -8,7 +8,13 @@ from typing import Annotated, Union
 import typer
 import uvicorn
 
-from likulau._internal.build import build_app
+from likulau._internal.build import DEFAULT_CONCURRENCY, MANIFEST_FILE, build_app
+from likulau._internal.console import console
+from likulau._internal.hot_reload import HotReload
+from likulau.env import env
+from likulau._internal.profiling import DEFAULT_TOKEN_TTL, create_token
+from likulau._internal.workers import DEFAULT_TIMEOUT, PreforkSupervisor
+from likulau._internal.manifest import ROUTE_MANIFEST_FILE, compile_route_manifest
 
 logger = logging.getLogger("likulau.console")
 app = typer.Typer()
@@ -44,10 +50,65 @@ def run(
         Union[int, None],
         typer.Option(help="Use multiple worker processes. Cannot be used with --reload flag."),
     ] = None,
+    isr: Annotated[
+        bool,
+        typer.Option(
+            help="Serve pages with get_static_paths() from a render cache seeded from the build output, re-rendering them in the background once their revalidate interval passes."
+        ),
+    ] = False,
+    preload: Annotated[
+        bool,
+        typer.Option(
+            help="Import every page once, then fork the workers so they share it. Requires --workers."
+        ),
+    ] = False,
+    max_requests: Annotated[
+        Union[int, None],
+        typer.Option(help="Recycle a worker after it served about this many requests."),
+    ] = None,
+    max_memory: Annotated[
+        Union[int, None],
+        typer.Option(help="Recycle a preloaded worker once its resident memory exceeds this many megabytes."),
+    ] = None,
+    worker_timeout: Annotated[
+        int,
+        typer.Option(help="Recycle a preloaded worker whose event loop has not responded for this many seconds."),
+    ] = DEFAULT_TIMEOUT,
 ):
     if not port:
         port = int(os.getenv("PORT", "8000"))
 
+    if isr:
+        # Passed through the environment so every worker picks it up
+        os.environ["ISR"] = "true"
+
+    if preload:
+        if not workers or reload:
+            console.print("[red][*] --preload requires --workers, and cannot be used with --reload")
+            raise typer.Exit(1)
+
+        from likulau.app import create_app
+
+        # Everything is imported eagerly, nothing is left for the workers to load
+        config = uvicorn.Config(
+            create_app(lazy=False),
+            host=host,
+            port=port,
+            log_level="info",
+            root_path=root_path,
+            proxy_headers=proxy_headers,
+            lifespan="on",
+            limit_max_requests=max_requests,
+        )
+        supervisor = PreforkSupervisor(
+            config,
+            workers,
+            timeout=worker_timeout,
+            max_memory=max_memory * 1024 * 1024 if max_memory else None,
+        )
+        supervisor.run()
+        return
+
     uvicorn.run(
         "likulau.app:create_app",
         host=host,
@@ -59,6 +120,7 @@ def run(
         factory=True,
         lifespan="on",
         workers=workers,
+        limit_max_requests=max_requests,
     )
 
 
@@ -84,8 +146,30 @@ def dev(
             help="Enable/Disable X-Forwarded-Proto, X-Forwarded-For, X-Forwarded-Port to populate remote address info."
         ),
     ] = True,
+    hot: Annotated[
+        bool,
+        typer.Option(
+            help="Reload changed pages, error handlers and providers in place, instead of restarting the server on every change."
+        ),
+    ] = True,
 ):
-    uvicorn.run(
+    if not hot:
+        uvicorn.run(
+            "likulau.app:create_app",
+            host=host,
+            port=port,
+            log_level="info",
+            root_path=root_path,
+            proxy_headers=proxy_headers,
+            factory=True,
+            lifespan="on",
+            reload=True,
+        )
+        return
+
+    # Passed through the environment so the server process picks it up
+    os.environ["HOT_RELOAD"] = "true"
+    config = uvicorn.Config(
         "likulau.app:create_app",
         host=host,
         port=port,
@@ -96,15 +180,25 @@ def dev(
         lifespan="on",
         reload=True,
     )
+    sock = config.bind_socket()
+    HotReload(config, target=uvicorn.Server(config).run, sockets=[sock]).run()
 
 
 @app.command()
 def build(
     target: Annotated[str, typer.Option(help="Target directory of the build result")] = "dist",
     force: Annotated[bool, typer.Option(help="Force regardless if target directory already exists")] = False,
+    concurrency: Annotated[
+        int, typer.Option(help="Amount of pages to render at the same time")
+    ] = DEFAULT_CONCURRENCY,
+    incremental: Annotated[
+        bool,
+        typer.Option(help="Only rebuild pages whose sources changed since the previous build."),
+    ] = True,
 ):
     dist_directory = Path(target).resolve()
-    if dist_directory.exists():
+    can_reuse = incremental and (dist_directory / MANIFEST_FILE).exists()
+    if dist_directory.exists() and not can_reuse:
         if not force:
             yn = typer.confirm("Target directory already exists, are you sure you want to continue?", default=False)
             if not yn:
@@ -112,8 +206,57 @@ def build(
 
         shutil.rmtree(dist_directory)
 
-    dist_directory.mkdir()
-    asyncio.run(build_app(dist_directory))
+    dist_directory.mkdir(exist_ok=True)
+    asyncio.run(build_app(dist_directory, concurrency, incremental))
+
+
+@app.command()
+def serve(
+    target: Annotated[str, typer.Option(help="Directory of the build result to serve")] = "dist",
+    host: Annotated[
+        str,
+        typer.Option(help="The host to serve on."),
+    ] = "127.0.0.1",
+    port: Annotated[
+        Union[int, None],
+        typer.Option(help="The port to serve on."),
+    ] = None,
+):
+    """Serves the output of `likulau build`, without running any page."""
+    if not port:
+        port = int(os.getenv("PORT", "8000"))
+
+    os.environ["DIST_DIRECTORY"] = target
+    uvicorn.run(
+        "likulau.app:create_static_app",
+        host=host,
+        port=port,
+        log_level="info",
+        factory=True,
+    )
+
+
+@app.command(name="compile")
+def compile_routes():
+    """Validates every page, error handler and provider, and writes the route manifest used for fast startup."""
+    manifest = compile_route_manifest()
+    console.print(
+        f"[green][*] Compiled {len(manifest['pages'])} pages, {len(manifest['errors'])} error handlers "
+        f"and {len(manifest['providers'])} providers to {ROUTE_MANIFEST_FILE}"
+    )
+
+
+@app.command()
+def profile_token(
+    ttl: Annotated[int, typer.Option(help="Seconds the token stays valid for")] = DEFAULT_TOKEN_TTL,
+):
+    """Prints a token that allows profiling requests, signed with PROFILE_SECRET."""
+    secret = env("PROFILE_SECRET", default=None)
+    if not secret:
+        console.print("[red][*] PROFILE_SECRET is not set")
+        raise typer.Exit(1)
+
+    print(create_token(secret, ttl))
 
 
 def run_cli():
@@ -0,0 +1,6 @@
+from likulau._internal.executor import ExecutorStats, executors
+
+
+def executor_stats() -> dict[str, ExecutorStats]:
+    """Snapshot of queue depth and wait times of every thread pool executor."""
+    return {name: executor.stats() for name, executor in executors.items()}
@@ -3,6 +3,13 @@ import liku.elements as e
 from liku.signatures import FormHTMLAttributes
 
 from likulau._internal.form_rpc import get_rpc_endpoint
+from likulau._internal.multipart import (
+    DEFAULT_SPOOL_SIZE,
+    FormField,
+    FormFile,
+    FormLimits,
+    FormStream,
+)
 from likulau.types import RPCFunction
 
 
@@ -16,3 +23,51 @@ def Form(children: list, **attribs: Unpack[LikuFormHTMLAttributes]):
         attribs["action"] = get_rpc_endpoint(action)
 
     return e.form(props=attribs, children=children)
+
+
+def rpc():
+    """Marks a function as a form handler, registering it as soon as its page is loaded.
+
+    Only needed for handlers whose form parameter is not annotated as FormData or
+    FormStream, others are found on their own.
+    """
+
+    def inner[F: RPCFunction](func: F) -> F:
+        func._rpc = True  # type: ignore
+        return func
+
+    return inner
+
+
+def form_limits(
+    max_body_size: int | None = None,
+    max_files: int | None = None,
+    max_fields: int | None = None,
+    spool_size: int = DEFAULT_SPOOL_SIZE,
+):
+    """Limits the form a form handler accepts.
+
+    Requests over any limit get a 413 response, as soon as the limit is crossed and
+    before the handler runs. Uploaded files larger than spool_size bytes are written
+    to a temporary file instead of being kept in memory.
+    """
+
+    def inner[F: RPCFunction](func: F) -> F:
+        func._form_limits = FormLimits(max_body_size, max_files, max_fields, spool_size)  # type: ignore
+        return func
+
+    return inner
+
+
+def streaming_form():
+    """Passes a FormStream to the form handler instead of FormData, yielding fields and
+    chunks of files as they arrive, so uploads never have to be held in full.
+
+    Limits set with form_limits() are enforced while the handler reads the form.
+    """
+
+    def inner[F: RPCFunction](func: F) -> F:
+        func._streaming_form = True  # type: ignore
+        return func
+
+    return inner
@@ -0,0 +1,18 @@
+from liku.elements import Fragment, HTMLNode
+
+
+class NamedFragment(Fragment):
+    """Part of a page that can be rendered on its own, see fragment()."""
+
+    def __init__(self, name: str, children: HTMLNode | None = None):
+        super().__init__(children=children)
+        self.name = name
+
+
+def fragment(name: str, children: HTMLNode | None = None):
+    """Marks part of a page, so requests asking for the fragment with this name only
+    receive it, rendered without the rest of the page and its layout.
+
+    Form handlers may also return one to tell which part of the page it replaces.
+    """
+    return NamedFragment(name, children)
@@ -0,0 +1 @@
+from likulau._internal.metrics import metrics_endpoint, metrics_text
@@ -1,11 +1,13 @@
 from liku.context import Context
+from likulau._internal.providers import ProviderScope
 from likulau.types import ProviderFunction
 
 
-def provider(ctx: Context, deps: list[Context]):
+def provider(ctx: Context, deps: list[Context], scope: ProviderScope = "request"):
     def inner(func: ProviderFunction):
         func._ctx = ctx
         func._deps = deps
+        func._scope = scope
         return func
 
     return inner
@@ -1,4 +1,12 @@
-from likulau.types import PageFunction
+from typing import Callable
+
+from starlette.requests import Request
+
+from likulau._internal.cache import CachePolicy
+from likulau._internal.coalesce import CoalescePolicy
+from likulau._internal.executor import Executor
+from likulau._internal.streaming import DEFAULT_CHUNK_SIZE
+from likulau.types import PageFunction, SSRFunction
 
 
 def methods(methods: list[str]):
@@ -7,3 +15,78 @@ def methods(methods: list[str]):
         return func
 
     return inner
+
+
+def streaming(chunk_size: int = DEFAULT_CHUNK_SIZE):
+    def inner(func: PageFunction):
+        func._streaming = chunk_size
+        return func
+
+    return inner
+
+
+def cached(ttl: float, query: list[str] | None = None, headers: list[str] | None = None):
+    """Caches the response of the page for ttl seconds.
+
+    Responses are keyed by the path parameters, plus the given query parameters and headers.
+    """
+
+    def inner(func: PageFunction):
+        func._cache = CachePolicy(ttl, query or [], headers or [])
+        return func
+
+    return inner
+
+
+def coalesce(key: Callable[[Request], str] | None = None, timeout: float | None = None):
+    """Shares one get_ssr_props() call between concurrent requests with the same key.
+
+    The key defaults to the path parameters. Every request waits at most timeout
+    seconds for the shared call, and receives its error if it fails.
+    """
+
+    def inner(func: SSRFunction):
+        func._coalesce = CoalescePolicy(key, timeout)
+        return func
+
+    return inner
+
+
+def thread_limit(limit: int):
+    """Gives the function its own thread pool of the given size.
+
+    On a page, the pool is also used for get_ssr_props() and layout().
+    """
+
+    def inner[F: Callable](func: F) -> F:
+        func._executor = Executor(f"{func.__module__}.{func.__qualname__}", limit)  # type: ignore
+        return func
+
+    return inner
+
+
+def inline():
+    """Runs a sync function directly on the event loop instead of a worker thread.
+
+    Only meant for cheap functions that never block.
+    """
+
+    def inner[F: Callable](func: F) -> F:
+        func._inline = True  # type: ignore
+        return func
+
+    return inner
+
+
+def process_pool():
+    """Renders the page, along with its layout, in a pool of worker processes.
+
+    Meant for pages that take long to build or serialize. Props are pickled and sent to
+    the worker, so the page cannot use the request or providers, only its props.
+    """
+
+    def inner(func: PageFunction):
+        func._process_pool = True
+        return func
+
+    return inner
@@ -0,0 +1,49 @@
+from collections import OrderedDict
+from functools import wraps
+from typing import Callable
+
+from liku import HTMLElement
+
+from likulau._internal.templates import StaticHTML, html
+
+DEFAULT_MAX_ENTRIES = 256
+
+
+def static(node: HTMLElement):
+    """Serializes node once, so every page it is placed into only copies its HTML.
+
+    Only use it on markup that never changes, such as a navigation bar built at import
+    time. Context values and hooks are resolved right away, not per request.
+    """
+    if isinstance(node, StaticHTML):
+        return node
+    return StaticHTML(node.render())
+
+
+def static_component(max_entries: int = DEFAULT_MAX_ENTRIES):
+    """Caches the serialized output of a component for each set of arguments it is called with.
+
+    Arguments must be hashable, and the component must only depend on them. The least
+    recently used outputs are dropped once more than max_entries are cached.
+    """
+
+    def decorator[**P](func: Callable[P, HTMLElement]) -> Callable[P, StaticHTML]:
+        rendered: OrderedDict[tuple, StaticHTML] = OrderedDict()
+
+        @wraps(func)
+        def inner(*args: P.args, **kwargs: P.kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            node = rendered.get(key)
+            if node:
+                rendered.move_to_end(key)
+                return node
+
+            node = static(func(*args, **kwargs))
+            rendered[key] = node
+            if len(rendered) > max_entries:
+                rendered.popitem(last=False)
+            return node
+
+        return inner
+
+    return decorator
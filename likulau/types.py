@@ -6,14 +6,22 @@ from starlette.datastructures import FormData
 from starlette.requests import Request
 from starlette.responses import Response
 
+from likulau._internal.multipart import FormStream
+
 type MaybeAwaitable[T] = T | Awaitable[T]
 type PageReturn = liku.HTMLElement | Response
 type PageFunction[PropsType] = (
     t.Callable[[PropsType], MaybeAwaitable[PageReturn]]
     | t.Callable[[], MaybeAwaitable[PageReturn]]
 )
-type RPCFunction = t.Callable[[FormData], MaybeAwaitable[PageReturn]]
+type RPCFunction = (
+    t.Callable[[FormData], MaybeAwaitable[PageReturn]]
+    | t.Callable[[FormStream], MaybeAwaitable[PageReturn]]
+)
 type SSRFunction[PropsType] = t.Callable[[Request], MaybeAwaitable[PropsType]]
+type VersionFunction[PropsType] = (
+    t.Callable[[PropsType], MaybeAwaitable[t.Any]] | t.Callable[[], MaybeAwaitable[t.Any]]
+)
 type StaticPathsFunction = t.Callable[[], MaybeAwaitable[list[dict[str, t.Any]]]]
 type ErrorHandlerFunction = t.Callable[[], MaybeAwaitable[PageReturn]]
 type LayoutFunction[PropsType] = t.Callable[
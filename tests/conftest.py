@@ -0,0 +1,34 @@
+import sys
+import textwrap
+from pathlib import Path
+
+import pytest
+
+
+def _forget_project_modules():
+    for module in [module for module in sys.modules if module == "src" or module.startswith("src.")]:
+        del sys.modules[module]
+
+
+class Project:
+    """A likulau project in a temporary directory, which is the working directory."""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def write(self, files: dict[str, str]):
+        for name, content in files.items():
+            path = self.root / name
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(textwrap.dedent(content))
+        # Edited modules are imported again by the next app
+        _forget_project_modules()
+
+
+@pytest.fixture
+def project(tmp_path: Path, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.syspath_prepend(str(tmp_path))
+    _forget_project_modules()
+    yield Project(tmp_path)
+    _forget_project_modules()
@@ -0,0 +1,82 @@
+import os
+import time
+
+import pytest
+
+from likulau._internal.build import build_app
+
+pytestmark = pytest.mark.anyio
+
+
+def touch_later(path):
+    # Modification times of quick successive writes may be equal
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+async def test_rebuilds_pages_when_indirect_imports_change(project):
+    project.write(
+        {
+            "src/__init__.py": "",
+            "src/pages/index.py": """
+                import liku as e
+                from src.components.outer import outer
+
+                def page() -> e.HTMLElement:
+                    return outer()
+            """,
+            "src/pages/about.py": """
+                import liku as e
+
+                def page() -> e.HTMLElement:
+                    return e.p(children="about")
+            """,
+            "src/components/outer.py": """
+                import liku as e
+                from src.components.inner import TEXT
+
+                def outer():
+                    return e.p(children=TEXT)
+            """,
+            "src/components/inner.py": 'TEXT = "first"\n',
+        }
+    )
+    dist = project.root / "dist"
+    dist.mkdir()
+    await build_app(dist)
+    assert "first" in (dist / "index.html").read_text()
+
+    project.write({"src/components/inner.py": 'TEXT = "second"\n'})
+    touch_later(project.root / "src/components/inner.py")
+    about_built_at = (dist / "about/index.html").stat().st_mtime_ns
+    time.sleep(0.01)
+    await build_app(dist)
+
+    assert "second" in (dist / "index.html").read_text()
+    # Pages not importing it are still skipped
+    assert (dist / "about/index.html").stat().st_mtime_ns == about_built_at
+
+
+async def test_redirecting_pages_are_built_with_their_target(project):
+    project.write(
+        {
+            "src/__init__.py": "",
+            "src/pages/new.py": """
+                import liku as e
+
+                def page() -> e.HTMLElement:
+                    return e.p(children="new page")
+            """,
+            "src/pages/old.py": """
+                from starlette.responses import RedirectResponse, Response
+
+                def page() -> Response:
+                    return RedirectResponse("/new")
+            """,
+        }
+    )
+    dist = project.root / "dist"
+    dist.mkdir()
+    await build_app(dist)
+
+    assert (dist / "old/index.html").read_text() == "<p>new page</p>"
@@ -0,0 +1,107 @@
+import httpx
+import liku as e
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import HTMLResponse
+
+from likulau._internal.cache import (
+    CACHE_HEADER,
+    CachePolicy,
+    MemoryCache,
+    _is_cacheable,
+    dump_response,
+    load_response,
+)
+from likulau._internal.routes import LikulauRoute
+
+pytestmark = pytest.mark.anyio
+
+
+def response(**headers):
+    return HTMLResponse("<p>hi</p>", headers=headers)
+
+
+def test_cacheable_responses():
+    policy = CachePolicy(30, headers=["Accept-Language"])
+    assert _is_cacheable(response(), policy)
+    assert _is_cacheable(response(**{"cache-control": "public, max-age=60"}), policy)
+    assert _is_cacheable(response(vary="accept-language, x-likulau-fragment"), policy)
+
+
+@pytest.mark.parametrize(
+    "headers",
+    [
+        {"set-cookie": "session=secret"},
+        {"cache-control": "private"},
+        {"cache-control": "max-age=0, no-store"},
+        {"vary": "Cookie"},
+        {"vary": "accept-language, authorization"},
+        {"vary": "*"},
+    ],
+)
+def test_private_responses_are_not_cacheable(headers):
+    assert not _is_cacheable(response(**headers), CachePolicy(30, headers=["accept-language"]))
+
+
+def test_errors_are_not_cacheable():
+    assert not _is_cacheable(HTMLResponse("gone", status_code=404), CachePolicy(30))
+
+
+def test_dumped_responses_load_back():
+    loaded = load_response(dump_response(response(**{"x-custom": "1"})))
+    assert loaded.status_code == 200
+    assert loaded.body == b"<p>hi</p>"
+    assert loaded.headers["x-custom"] == "1"
+
+
+async def test_memory_cache_evicts_least_recently_used():
+    cache = MemoryCache(max_bytes=10)
+    await cache.set("a", b"aaaa", 60)
+    await cache.set("b", b"bbbb", 60)
+    assert await cache.get("a") == b"aaaa"
+    await cache.set("c", b"cccc", 60)
+
+    assert await cache.get("b") is None
+    assert await cache.get("a") == b"aaaa"
+    assert await cache.get("c") == b"cccc"
+
+    await cache.set("expired", b"x", 0)
+    assert await cache.get("expired") is None
+
+
+async def test_session_cookies_are_not_replayed():
+    sessions = iter(range(100))
+
+    def page() -> HTMLResponse:
+        response = HTMLResponse("<p>hi</p>")
+        response.set_cookie("session", str(next(sessions)))
+        return response
+
+    route = LikulauRoute("/", page, cache=CachePolicy(30))
+    app = Starlette(routes=[route.create_router_func(cache_backend=MemoryCache())])
+    transport = httpx.ASGITransport(app=app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as a:
+        first = await a.get("/")
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as b:
+        second = await b.get("/")
+
+    assert first.headers[CACHE_HEADER] == second.headers[CACHE_HEADER] == "MISS"
+    assert first.cookies["session"] != second.cookies["session"]
+
+
+async def test_cached_pages_hit():
+    renders = []
+
+    def page() -> e.HTMLElement:
+        renders.append(1)
+        return e.p(children="hi")
+
+    route = LikulauRoute("/", page, cache=CachePolicy(30, query=["q"]))
+    app = Starlette(routes=[route.create_router_func(cache_backend=MemoryCache())])
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as c:
+        assert (await c.get("/")).headers[CACHE_HEADER] == "MISS"
+        assert (await c.get("/?other=1")).headers[CACHE_HEADER] == "HIT"
+        assert (await c.get("/?q=1")).headers[CACHE_HEADER] == "MISS"
+
+    assert len(renders) == 2
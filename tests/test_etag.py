@@ -0,0 +1,101 @@
+import os
+
+import httpx
+import liku as e
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+
+from likulau._internal.etag import body_etag, etag_matches, version_salt
+from likulau._internal.routes import LikulauRoute
+
+pytestmark = pytest.mark.anyio
+
+
+def request(method="GET", if_none_match: str | None = None):
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": method, "path": "/", "query_string": b"", "headers": headers})
+
+
+def client(route: LikulauRoute):
+    app = Starlette(routes=[route.create_router_func()])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+def test_etag_matching_is_weak():
+    etag = body_etag(b"<p>hi</p>")
+    assert etag.startswith('W/"')
+    assert etag_matches(request(if_none_match=etag), etag)
+    assert etag_matches(request(if_none_match=etag.removeprefix("W/")), etag)
+    assert etag_matches(request(if_none_match=f'"other", {etag}'), etag)
+    assert etag_matches(request(if_none_match="*"), etag)
+    assert not etag_matches(request(if_none_match='"other"'), etag)
+    assert not etag_matches(request(), etag)
+    assert not etag_matches(request("POST", if_none_match=etag), etag)
+
+
+async def test_rendered_pages_answer_304():
+    def page() -> e.HTMLElement:
+        return e.p(children="hi")
+
+    async with client(LikulauRoute("/", page)) as c:
+        response = await c.get("/")
+        etag = response.headers["etag"]
+        assert etag == body_etag(b"<p>hi</p>")
+        assert "x-likulau-fragment" in response.headers["vary"]
+
+        response = await c.get("/", headers={"if-none-match": etag})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        assert "content-type" not in response.headers
+
+        response = await c.post("/", headers={"if-none-match": etag})
+        assert response.status_code == 405
+
+
+async def test_get_version_skips_rendering():
+    rendered = []
+
+    def get_version(props):
+        return props
+
+    def get_ssr_props(request: Request):
+        return request.query_params.get("v", "1")
+
+    def page(props) -> e.HTMLElement:
+        rendered.append(props)
+        return e.p(children=props)
+
+    route = LikulauRoute("/", page, ssr_props_func=get_ssr_props, version_func=get_version)
+    async with client(route) as c:
+        etag = (await c.get("/")).headers["etag"]
+        assert etag.startswith('W/"v-')
+        assert rendered == ["1"]
+
+        response = await c.get("/", headers={"if-none-match": etag})
+        assert response.status_code == 304
+        assert rendered == ["1"]
+
+        # A new version renders again
+        response = await c.get("/?v=2", headers={"if-none-match": etag})
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert rendered == ["1", "2"]
+
+        # Fragments of the same version are another representation
+        response = await c.get("/?liku-fragment=", headers={"if-none-match": etag})
+        assert response.status_code == 200
+
+
+def test_version_salt_follows_source_not_mtime(project):
+    project.write({"src/__init__.py": "", "src/versions.py": "def get_version():\n    return 1\n"})
+    from src.versions import get_version
+
+    salt = version_salt(get_version)
+    path = project.root / "src/versions.py"
+    os.utime(path, ns=(0, 0))
+    assert version_salt(get_version) == salt
+
+    path.write_text("def get_version():\n    return 2\n")
+    assert version_salt(get_version) != salt
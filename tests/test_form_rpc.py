@@ -0,0 +1,54 @@
+import pytest
+
+from likulau._internal import form_rpc
+from likulau._internal.form_rpc import get_rpc_ident, register_module_rpcs, registered_rpcs
+
+
+@pytest.fixture(autouse=True)
+def registered(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(form_rpc, "RPC_MAPPING", {})
+    monkeypatch.setattr(form_rpc, "RPC_SOURCES", {})
+
+
+@pytest.fixture
+def page(project):
+    project.write(
+        {
+            "src/__init__.py": "",
+            "src/pages/index.py": """
+                from starlette.datastructures import FormData
+
+                def on_submit(form: FormData):
+                    pass
+
+                def helper(value: int):
+                    pass
+            """,
+        }
+    )
+    from src.pages import index
+
+    return index
+
+
+def test_handlers_are_found_by_annotation(page):
+    register_module_rpcs(page)
+    assert registered_rpcs() == {get_rpc_ident(page.on_submit): "src.pages.index:on_submit"}
+
+
+def test_lazy_loads_take_handlers_from_the_manifest(page, monkeypatch: pytest.MonkeyPatch):
+    def get_type_hints(obj):
+        raise AssertionError(f"Annotations of {obj.__qualname__} were read")
+
+    form_rpc.RPC_SOURCES.update(
+        {"submit": "src.pages.index:on_submit", "other": "src.pages.other:on_submit"}
+    )
+    monkeypatch.setattr(form_rpc.typing, "get_type_hints", get_type_hints)
+    register_module_rpcs(page, validate=False)
+
+    assert form_rpc.RPC_MAPPING == {"submit": page.on_submit}
+
+
+def test_lazy_loads_without_a_manifest_read_annotations(page):
+    register_module_rpcs(page, validate=False)
+    assert list(form_rpc.RPC_MAPPING.values()) == [page.on_submit]
@@ -0,0 +1,21 @@
+import pytest
+
+from benchmarks.memory import DEFAULT_BUDGET, RETAINED_ALLOWANCE, measure
+from benchmarks.suite import create_requests, generate_app
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.mark.parametrize("providers", [0, 4])
+async def test_requests_stay_within_memory_budget(project, providers: int):
+    # The same app benchmarks/memory.py measures, kept small
+    dynamic_path = generate_app(project.root, pages=2, depth=3, providers=providers)
+
+    from likulau.app import create_app
+
+    app = create_app(isr=False, lazy=False)
+    async with app.router.lifespan_context(app):
+        for name, (scope, body) in create_requests(dynamic_path).items():
+            peak, retained = await measure(app, scope, body, 100)
+            assert peak <= DEFAULT_BUDGET, f"{name} allocated {peak} bytes"
+            assert retained <= RETAINED_ALLOWANCE, f"{name} kept {retained} bytes"
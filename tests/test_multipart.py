@@ -0,0 +1,199 @@
+from types import ModuleType
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import PlainTextResponse
+
+from likulau._internal import form_rpc
+from likulau._internal.form_rpc import (
+    FormRPCMiddleware,
+    _load_rpc,
+    get_rpc_endpoint,
+    register_module_rpcs,
+)
+from likulau._internal.multipart import FormLimitExceeded, FormLimits, read_form
+from likulau.form import FormField, FormFile, FormStream, form_limits, streaming_form
+
+pytestmark = pytest.mark.anyio
+
+BOUNDARY = "boundary"
+
+
+@pytest.fixture(autouse=True)
+def registered(monkeypatch: pytest.MonkeyPatch):
+    # Handlers defined by tests share their names, and so their idents
+    monkeypatch.setattr(form_rpc, "RPC_MAPPING", {})
+    monkeypatch.setattr(form_rpc, "RPC_SOURCES", {})
+
+
+def multipart_body(*parts: tuple[str, str | None, bytes]):
+    body = b""
+    for name, filename, value in parts:
+        disposition = f'form-data; name="{name}"'
+        if filename:
+            disposition += f'; filename="{filename}"'
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + value + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def request(chunks: list[bytes]):
+    headers = [(b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode())]
+    messages = [{"type": "http.request", "body": chunk, "more_body": True} for chunk in chunks]
+    messages.append({"type": "http.request", "body": b"", "more_body": False})
+
+    async def receive():
+        if not messages:
+            raise AssertionError("Body read past its end")
+        return messages.pop(0)
+
+    scope = {"type": "http", "method": "POST", "path": "/", "query_string": b"", "headers": headers}
+    return Request(scope, receive)
+
+
+def client():
+    app = FormRPCMiddleware(Starlette())
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")  # type: ignore
+
+
+async def post(handler, body: bytes | list[bytes]):
+    content = body
+    if isinstance(body, list):
+        # Sent without a Content-Length header
+        async def stream():
+            for chunk in body:
+                yield chunk
+
+        content = stream()
+
+    async with client() as c:
+        return await c.post(
+            get_rpc_endpoint(handler),
+            content=content,  # type: ignore
+            headers={"content-type": f"multipart/form-data; boundary={BOUNDARY}"},
+        )
+
+
+async def test_content_length_is_refused_before_reading():
+    async def receive():
+        raise AssertionError("Body was read")
+
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "path": "/",
+        "query_string": b"",
+        "headers": [
+            (b"content-type", f"multipart/form-data; boundary={BOUNDARY}".encode()),
+            (b"content-length", b"1000"),
+        ],
+    }
+    with pytest.raises(FormLimitExceeded):
+        await read_form(Request(scope, receive), FormLimits(max_body_size=100))
+
+
+async def test_oversized_body_is_refused_before_the_handler():
+    called = []
+
+    @form_limits(max_body_size=100)
+    def handler(form):
+        called.append(form)
+        return PlainTextResponse("ok")
+
+    response = await post(handler, multipart_body(("text", None, b"x" * 200)))
+    assert response.status_code == 413
+    assert called == []
+
+
+async def test_body_without_content_length_is_cut_off_midstream():
+    parts = []
+
+    @streaming_form()
+    @form_limits(max_body_size=200)
+    async def handler(form: FormStream):
+        async for part in form:
+            parts.append(part.name)
+        return PlainTextResponse("ok")
+
+    body = multipart_body(("first", None, b"1"), ("second", None, b"x" * 500))
+    response = await post(handler, [body[:100], body[100:300], body[300:]])
+    assert response.status_code == 413
+    # Parts received before the limit was crossed still reach the handler
+    assert parts == ["first"]
+
+
+@pytest.mark.parametrize(
+    "limits, parts",
+    [
+        ({"max_files": 1}, [("a", "a.txt", b"a"), ("b", "b.txt", b"b")]),
+        ({"max_fields": 1}, [("a", None, b"a"), ("b", None, b"b")]),
+    ],
+)
+async def test_part_counts_are_limited(limits, parts):
+    @form_limits(**limits)
+    def handler(form):
+        return PlainTextResponse("ok")
+
+    assert (await post(handler, multipart_body(*parts[:1]))).status_code == 200
+    response = await post(handler, multipart_body(*parts))
+    assert response.status_code == 413
+
+
+async def test_large_files_are_spooled_to_disk():
+    body = multipart_body(("small", "small.txt", b"s" * 10), ("large", "large.txt", b"l" * 1000))
+    form = await read_form(request([body]), FormLimits(spool_size=100))
+    try:
+        assert not form["small"].file._rolled  # type: ignore
+        assert form["large"].file._rolled  # type: ignore
+        assert await form["large"].read() == b"l" * 1000  # type: ignore
+    finally:
+        await form.close()
+
+
+async def test_unread_files_are_skipped():
+    seen = {}
+
+    @streaming_form()
+    async def handler(form: FormStream):
+        async for part in form:
+            if isinstance(part, FormFile):
+                seen[part.name] = part.filename
+            else:
+                assert isinstance(part, FormField)
+                seen[part.name] = part.value
+        return PlainTextResponse("ok")
+
+    body = multipart_body(("upload", "a.txt", b"a" * 1000), ("name", None, b"Ren"))
+    response = await post(handler, [body[:50], body[50:600], body[600:]])
+    assert response.status_code == 200
+    assert seen == {"upload": "a.txt", "name": "Ren"}
+
+
+def test_sync_streaming_handlers_are_refused():
+    @streaming_form()
+    def upload(form: FormStream):
+        pass
+
+    module = ModuleType("src.pages.upload")
+    module.upload = upload  # type: ignore
+    with pytest.raises(Exception, match="must be an async function"):
+        register_module_rpcs(module)
+
+
+def test_sync_streaming_handlers_from_the_manifest_are_refused(project):
+    project.write(
+        {
+            "src/__init__.py": "",
+            "src/upload.py": """
+                from likulau.form import FormStream, streaming_form
+
+                @streaming_form()
+                def upload(form: FormStream):
+                    pass
+            """,
+        }
+    )
+    form_rpc.RPC_SOURCES["upload"] = "src.upload:upload"
+    with pytest.raises(Exception, match="must be an async function"):
+        _load_rpc("upload")
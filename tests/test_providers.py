@@ -0,0 +1,188 @@
+import sys
+from contextlib import asynccontextmanager, contextmanager
+from types import ModuleType
+
+import anyio
+import pytest
+from liku.context import Context
+
+from likulau._internal import providers
+from likulau.providers import provider
+
+pytestmark = pytest.mark.anyio
+
+
+@pytest.fixture
+def install(monkeypatch: pytest.MonkeyPatch):
+    """Sets up the given provider functions as if each was a module of src/providers."""
+    monkeypatch.setattr(providers, "app_providers", {})
+    monkeypatch.setattr(providers, "app_queue", [])
+    monkeypatch.setattr(providers, "resolve_levels", [])
+    monkeypatch.setattr(providers, "app_values", {})
+
+    def inner(*funcs):
+        modules = []
+        for index, func in enumerate(funcs):
+            name = f"tests_providers_{index}"
+            module = ModuleType(name)
+            module.provider = func  # type: ignore
+            monkeypatch.setitem(sys.modules, name, module)
+            modules.append(name)
+        providers.setup_providers(modules)
+
+    return inner
+
+
+def value_provider(ctx: Context, value, deps: list[Context] | None = None, scope="request", log=None):
+    @provider(ctx, deps or [], scope)
+    @asynccontextmanager
+    async def func():
+        with ctx.provide(value() if callable(value) else value):
+            try:
+                yield
+            except BaseException as e:
+                if log is not None:
+                    log.append((ctx.context.name, "rollback", type(e).__name__))
+                raise
+            else:
+                if log is not None:
+                    log.append((ctx.context.name, "commit"))
+
+    return func
+
+
+async def test_independent_providers_enter_concurrently(install):
+    a, b = Context[str]("a"), Context[str]("b")
+    entered = {"a": anyio.Event(), "b": anyio.Event()}
+
+    def waiting(ctx: Context, other: str):
+        @provider(ctx, [])
+        @asynccontextmanager
+        async def func():
+            entered[ctx.context.name].set()
+            # Sequential entering would never get past this
+            with anyio.fail_after(1):
+                await entered[other].wait()
+            with ctx.provide(ctx.context.name):
+                yield
+
+        return func
+
+    install(waiting(a, "b"), waiting(b, "a"))
+    assert providers.resolve_levels == [[a, b]]
+
+    async with providers.provide_all():
+        assert (a.get(), b.get()) == ("a", "b")
+
+
+async def test_dependencies_are_entered_first(install):
+    a, b = Context[str]("a"), Context[str]("b")
+    c = Context[str]("c")
+    install(
+        value_provider(c, lambda: f"{a.get()}+{b.get()}", [a, b]),
+        value_provider(a, "a"),
+        value_provider(b, "b"),
+    )
+
+    assert [set(level) for level in providers.resolve_levels] == [{a, b}, {c}]
+    async with providers.provide_all():
+        assert c.get() == "a+b"
+
+    with pytest.raises(LookupError):
+        c.get()
+
+
+def test_missing_dependency_is_reported(install):
+    a, missing = Context[str]("a"), Context[str]("missing")
+    with pytest.raises(Exception, match="no provider exists for it"):
+        install(value_provider(a, "a", [missing]))
+
+
+def test_cycle_is_reported(install):
+    a, b = Context[str]("a"), Context[str]("b")
+    with pytest.raises(Exception, match="Circular dependency"):
+        install(value_provider(a, "a", [b]), value_provider(b, "b", [a]))
+
+
+def test_app_provider_cannot_depend_on_request_provider(install):
+    a, b = Context[str]("a"), Context[str]("b")
+    with pytest.raises(Exception, match="cannot depend on request scoped"):
+        install(value_provider(a, "a", [b], scope="app"), value_provider(b, "b"))
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+async def test_page_exception_reaches_every_provider(install, concurrent: bool):
+    log = []
+    a, b = Context[str]("a"), Context[str]("b")
+    install(value_provider(a, "a", log=log), value_provider(b, "b", [] if concurrent else [a], log=log))
+
+    with pytest.raises(ValueError):
+        async with providers.provide_all():
+            raise ValueError("page failed")
+
+    assert sorted(log) == [("a", "rollback", "ValueError"), ("b", "rollback", "ValueError")]
+
+    log.clear()
+    async with providers.provide_all():
+        pass
+    assert sorted(log) == [("a", "commit"), ("b", "commit")]
+
+
+@pytest.mark.parametrize("concurrent", [True, False])
+async def test_provider_failing_to_enter(install, concurrent: bool):
+    log = []
+    a, b = Context[str]("a"), Context[str]("b")
+
+    @provider(b, [] if concurrent else [a])
+    @contextmanager
+    def failing():
+        raise RuntimeError("cannot connect")
+        yield
+
+    install(value_provider(a, "a", log=log), failing)
+    with pytest.raises(RuntimeError, match="cannot connect"):
+        async with providers.provide_all():
+            pytest.fail("Entered the request with a provider missing")
+
+    # What was entered is exited again
+    assert len(log) == 1 and log[0][:2] == ("a", "rollback")
+
+
+async def test_provider_without_value(install):
+    a = Context[str]("a")
+
+    @provider(a, [])
+    @contextmanager
+    def empty():
+        yield
+
+    install(empty)
+    with pytest.raises(Exception, match="did not provide a value"):
+        async with providers.provide_all():
+            pass
+
+
+async def test_app_values_are_visible_per_request(install):
+    created = []
+    pool, db = Context[str]("pool"), Context[str]("db")
+
+    def create_pool():
+        created.append(1)
+        return f"pool {len(created)}"
+
+    install(
+        value_provider(pool, create_pool, scope="app"),
+        value_provider(db, lambda: f"db on {pool.get()}", [pool]),
+    )
+    assert providers.app_queue == [pool]
+
+    async def request():
+        async with providers.provide_all():
+            return pool.get(), db.get()
+
+    async with providers.provide_app():
+        for _ in range(2):
+            assert await request() == ("pool 1", "db on pool 1")
+
+    assert created == [1]
+    assert providers.app_values == {}
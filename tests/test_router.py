@@ -0,0 +1,111 @@
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from starlette.responses import PlainTextResponse
+from starlette.routing import Mount, Route, Router
+
+from likulau._internal.router import SegmentRouter
+from likulau._internal.routes import _sort_route
+
+pytestmark = pytest.mark.anyio
+
+
+def endpoint_for(name: str):
+    async def endpoint(request):
+        return PlainTextResponse(f"{name} {dict(request.path_params)}")
+
+    return endpoint
+
+
+async def mounted(scope, receive, send):
+    await PlainTextResponse(f"mounted {scope['path']}")(scope, receive, send)
+
+
+def create_routes():
+    pages = [
+        ("/", None),
+        ("/posts/new", None),
+        ("/posts/{slug}", None),
+        ("/posts/{post_id:int}/edit", None),
+        ("/posts/{slug}/comments/{comment}", None),
+        ("/users/me", ["POST"]),
+        ("/users/{user}", None),
+        ("/only-post", ["POST"]),
+        ("/files/{rest:path}", None),
+        ("/prefix-{name}", None),
+    ]
+    # Sorted like discover_pages() sorts them, static routes first
+    pages.sort(key=lambda page: _sort_route(SimpleNamespace(path=page[0])))  # type: ignore
+    routes = [Route(path, endpoint_for(path), methods=methods) for path, methods in pages]
+    return routes + [Mount("/static", app=mounted)]
+
+
+async def call(router: Router, method: str, path: str):
+    transport = httpx.ASGITransport(app=router)  # type: ignore
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+        response = await client.request(method, path)
+    return response.status_code, response.text, response.headers.get("location")
+
+
+@pytest.mark.parametrize(
+    "method, path, status",
+    [
+        ("GET", "/", 200),
+        # Static segments take precedence over parameters
+        ("GET", "/posts/new", 200),
+        ("GET", "/posts/hello", 200),
+        ("GET", "/posts/12/edit", 200),
+        ("GET", "/posts/hello/edit", 404),
+        ("GET", "/posts/hello/comments/3", 200),
+        # A route only matching the path, not the method, loses to a later full match
+        ("GET", "/users/me", 200),
+        ("POST", "/users/me", 200),
+        ("GET", "/only-post", 405),
+        ("POST", "/only-post", 200),
+        # Parameters never match empty segments
+        ("GET", "/posts/", 404),
+        # Trailing slashes redirect to the route without one
+        ("GET", "/posts/new/", 307),
+        ("GET", "/users", 404),
+        ("GET", "/files/a/b/c.txt", 200),
+        ("GET", "/prefix-x", 200),
+        ("GET", "/static/app.js", 200),
+        ("GET", "/missing/path", 404),
+    ],
+)
+async def test_matches_like_starlette(method: str, path: str, status: int):
+    routes = create_routes()
+    expected = await call(Router(routes), method, path)
+    assert expected[0] == status
+    assert await call(SegmentRouter(routes), method, path) == expected
+
+
+async def test_url_path_for_is_unchanged():
+    routes = create_routes()
+    assert SegmentRouter(routes).url_path_for("endpoint", slug="a") == Router(routes).url_path_for(
+        "endpoint", slug="a"
+    )
+
+
+async def test_routes_added_later_are_found():
+    routes = create_routes()
+    router = SegmentRouter(routes)
+    assert (await call(router, "GET", "/late"))[0] == 404
+
+    router.routes.append(Route("/late", endpoint_for("late")))
+    assert (await call(router, "GET", "/late"))[0] == 200
+
+
+async def test_invalidate_after_replacing_routes_in_place():
+    routes = create_routes()
+    router = SegmentRouter(routes)
+    assert (await call(router, "GET", "/posts/new"))[0] == 200
+
+    index = next(index for index, route in enumerate(router.routes) if route.path == "/posts/new")
+    router.routes[index] = Route("/posts/latest", endpoint_for("latest"))
+    router.invalidate()
+
+    assert await call(router, "GET", "/posts/latest") == (200, "latest {}", None)
+    # Falls through to the parameter route instead
+    assert (await call(router, "GET", "/posts/new"))[1] == "/posts/{slug} {'slug': 'new'}"
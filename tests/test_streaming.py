@@ -0,0 +1,77 @@
+import asyncio
+import inspect
+
+import httpx
+import liku as e
+import pytest
+from starlette.applications import Starlette
+
+from likulau._internal.routes import LikulauRoute
+from likulau._internal.streaming import Slot, discard, iter_html
+from likulau.fragments import fragment
+
+pytestmark = pytest.mark.anyio
+
+
+def client(route: LikulauRoute):
+    app = Starlette(routes=[route.create_router_func()])
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test")
+
+
+async def late(text: str):
+    await asyncio.sleep(0)
+    return e.p(children=text)
+
+
+async def test_iter_html_flushes_before_awaitables():
+    tree = e.div(children=[e.p(children="early"), late("late")])
+    chunks = [chunk async for chunk in iter_html(tree, chunk_size=1024)]
+    assert chunks == ["<div><p>early</p>", "<p>late</p></div>"]
+
+
+async def test_iter_html_escapes_text():
+    chunks = [chunk async for chunk in iter_html(e.p(children="<b>"))]
+    assert "".join(chunks) == "<p>&lt;b&gt;</p>"
+
+
+def test_discard_closes_pending_coroutines():
+    pending = late("never")
+    slot = Slot(late("slot"))
+    discard(e.div(children=[e.p(children=pending)]))
+    discard(slot)
+    assert inspect.getcoroutinestate(pending) == inspect.CORO_CLOSED
+    assert inspect.getcoroutinestate(slot.content) == inspect.CORO_CLOSED
+
+
+async def test_fragment_closes_awaitables_outside_of_it():
+    outside = []
+
+    def page() -> e.HTMLElement:
+        coroutine = late("outside")
+        outside.append(coroutine)
+        return e.div(children=[coroutine, fragment("f", late("inside"))])
+
+    async with client(LikulauRoute("/", page, streaming=16)) as c:
+        response = await c.get("/", params={"liku-fragment": "f"})
+
+    assert response.status_code == 200
+    assert "inside" in response.text and "outside" not in response.text
+    assert inspect.getcoroutinestate(outside[0]) == inspect.CORO_CLOSED
+
+
+async def test_layout_dropping_the_page_closes_it():
+    slots = []
+
+    def layout(props, children: e.HTMLElement) -> e.HTMLElement:
+        slots.append(children)
+        return e.p(children="maintenance")
+
+    def page() -> e.HTMLElement:
+        return e.div(children="page")
+
+    route = LikulauRoute("/", page, layout_func=layout, streaming=16)
+    async with client(route) as c:
+        response = await c.get("/")
+
+    assert response.text == "<p>maintenance</p>"
+    assert inspect.getcoroutinestate(slots[0].content) == inspect.CORO_CLOSED
@@ -0,0 +1,163 @@
+import re
+import sys
+from types import ModuleType
+
+import liku as e
+import pytest
+
+from likulau._internal import templates
+from likulau._internal.templates import StaticHTML, compile_module_templates, html, static_spans
+from likulau.templates import static, static_component
+
+# liku.htm is not a dependency of the tests, this stands in for it by substituting
+# {{ expressions }} evaluated in the calling frame
+rendered_sources: list[str] = []
+
+
+def fake_htm(source: str):
+    rendered_sources.append(source)
+    frame = sys._getframe(1)
+    return StaticHTML(
+        re.sub(
+            r"\{\{\s*(.*?)\s*\}\}",
+            lambda match: str(eval(match.group(1), frame.f_globals, frame.f_locals)),
+            source,
+        )
+    )
+
+
+@pytest.fixture(autouse=True)
+def htm(monkeypatch: pytest.MonkeyPatch):
+    module = ModuleType("liku.htm")
+    module.html = fake_htm  # type: ignore
+    monkeypatch.setitem(sys.modules, "liku.htm", module)
+    monkeypatch.setattr(templates, "htm_html", fake_htm)
+    templates.compile_template.cache_clear()
+    rendered_sources.clear()
+    yield
+    templates.compile_template.cache_clear()
+
+
+def statics(source: str):
+    return [source[start:end] for start, end in static_spans(source)]
+
+
+def test_outermost_static_elements_are_found():
+    source = """
+        <main>
+            <nav><a href="/">Home</a><a href="/posts">Posts</a></nav>
+            <p>Hello, {{ name }}!</p>
+            <footer><p>Bye</p></footer>
+        </main>
+    """
+    assert statics(source) == [
+        '<nav><a href="/">Home</a><a href="/posts">Posts</a></nav>',
+        "<footer><p>Bye</p></footer>",
+    ]
+
+
+@pytest.mark.parametrize(
+    "source",
+    [
+        '<a href="{{ url }}">Link</a>',
+        '<Form :action="on_submit"><label>Name</label></Form>',
+        '<a :href="url">Link</a>',
+        "<div ...{{ props }}>Text</div>",
+        "<ui.Card>Text</ui.Card>",
+        "<p>Text<!-- {{ note }} --></p>",
+    ],
+)
+def test_evaluated_elements_are_not_static(source: str):
+    assert statics(source) in ([], ["<label>Name</label>"])
+
+
+def test_empty_void_and_raw_text_elements():
+    assert statics('<div></div><br /><input type="text">') == []
+    assert statics("<script>if (a < b && c > d) {}</script>") == ["<script>if (a < b && c > d) {}</script>"]
+    assert statics("<p>a < b</p>") == ["<p>a < b</p>"]
+
+
+@pytest.mark.parametrize("source", ["<div><p>Unclosed</div>", "<p>Text</span>", "<div>", "<!-- open"])
+def test_malformed_markup_is_left_alone(source: str):
+    assert statics(source) == []
+
+
+TEMPLATE = """
+    <main>
+        <nav><a href="/">Home</a></nav>
+        <p>Hello, {{ name }}!</p>
+    </main>
+"""
+
+
+def test_compiled_templates_render_like_liku_htm():
+    def page(render, name: str):
+        return render(TEMPLATE)
+
+    for name in ["Ren", "Iris"]:
+        assert str(page(html, name)) == str(page(fake_htm, name))
+        assert f"Hello, {name}!" in str(page(html, name))
+
+
+def test_static_elements_are_rendered_once():
+    name = "Ren"
+    for _ in range(3):
+        html(TEMPLATE)
+
+    assert rendered_sources.count('<nav><a href="/">Home</a></nav>') == 1
+    assert not any("<nav>" in source for source in rendered_sources[1:])
+
+
+def test_discovered_modules_render_through_compiled_templates(project):
+    project.write(
+        {
+            "src/__init__.py": "",
+            "src/components/nav.py": """
+                from liku.htm import html
+
+                def nav():
+                    return html("<nav><a href='/'>Home</a></nav>")
+            """,
+            "src/pages/index.py": """
+                from liku.htm import html
+                from src.components.nav import nav
+
+                def page():
+                    return html("<main>{{ nav() }}</main>")
+            """,
+        }
+    )
+    from src.components import nav as nav_module
+    from src.pages import index
+
+    compile_module_templates(index)
+    assert index.html is html
+    assert nav_module.html is html
+    assert str(index.page()) == "<main><nav><a href='/'>Home</a></nav></main>"
+
+
+def test_compiling_can_be_turned_off(project, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("COMPILE_TEMPLATES", "false")
+    project.write({"src/__init__.py": "", "src/pages/index.py": "from liku.htm import html\n"})
+    from src.pages import index
+
+    compile_module_templates(index)
+    assert index.html is fake_htm
+
+
+def test_static_markup_is_serialized_once():
+    calls = []
+
+    @static_component(max_entries=1)
+    def badge(label: str):
+        calls.append(label)
+        return e.span(children=label)
+
+    assert str(badge("new")) == str(badge("new")) == "<span>new</span>"
+    badge("old")
+    badge("new")
+    assert calls == ["new", "old", "new"]
+
+    node = static(e.p(children="hi"))
+    assert static(node) is node
+    assert node.render() == "<p>hi</p>"